@@ -0,0 +1,181 @@
+"""
+Microbenchmarks for the CPU hot paths of the bot.
+
+Run from the src directory:
+
+    uv run python -m benchmarks run --output results.json
+    uv run python -m benchmarks compare base.json results.json
+
+The load test reads the bot configuration from the environment like the bot
+does, but never contacts Telegram or song.link, so the tokens may be dummies:
+
+    uv run python -m benchmarks load-test --rate 100 --duration 30
+"""
+
+import asyncio
+import json
+import multiprocessing
+import platform
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import UTC, datetime
+from pathlib import Path
+
+import click
+import uvloop
+from bs_config import Env
+
+from benchmarks.cases import collect
+from benchmarks.harness import Measurement, measure
+from benchmarks.load_test import LatencyDistribution, LoadTestOptions, run_load_test
+from songlinker.config import Config
+from songlinker.link_api import LinkApi
+
+RESULT_VERSION = 1
+
+
+@click.group()
+def app() -> None:
+    pass
+
+
+async def _run(name_filter: str | None, min_time: float) -> list[Measurement]:
+    api = LinkApi(api_key="benchmark")
+    strict_api = LinkApi(api_key="benchmark", strict_parsing=True)
+    # A single worker, like a WorkerPool under low load
+    executor = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+    try:
+        measurements = []
+        for benchmark in collect(api, strict_api, executor):
+            if name_filter and name_filter not in benchmark.name:
+                continue
+
+            measurement = measure(benchmark.name, benchmark.func, min_time=min_time)
+            click.echo(measurement.format())
+            measurements.append(measurement)
+
+        return measurements
+    finally:
+        executor.shutdown()
+        await api.close()
+        await strict_api.close()
+
+
+@app.command()
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path))
+@click.option("--filter", "name_filter", help="Only run benchmarks containing this")
+@click.option("--min-time", default=0.5, help="Minimum seconds per benchmark")
+def run(output: Path | None, name_filter: str | None, min_time: float) -> None:
+    measurements = asyncio.run(_run(name_filter, min_time))
+
+    if output is not None:
+        result = {
+            "version": RESULT_VERSION,
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "results": [asdict(measurement) for measurement in measurements],
+        }
+        output.write_text(json.dumps(result, indent=2) + "\n", "utf-8")
+
+
+def _load(path: Path) -> dict[str, Measurement]:
+    content = json.loads(path.read_text("utf-8"))
+    if content.get("version") != RESULT_VERSION:
+        raise click.ClickException(f"Unsupported result version in {path}")
+
+    return {result["name"]: Measurement(**result) for result in content["results"]}
+
+
+def _change(base: float, new: float) -> str:
+    if base == 0:
+        return "n/a"
+
+    return f"{(new - base) / base:+.1%}"
+
+
+@app.command()
+@click.argument("base", type=click.Path(exists=True, path_type=Path))
+@click.argument("new", type=click.Path(exists=True, path_type=Path))
+def compare(base: Path, new: Path) -> None:
+    base_results = _load(base)
+    new_results = _load(new)
+
+    click.echo(f"{'benchmark':<50} {'ops/s':>10} {'CPU/op':>10} {'peak B/op':>10}")
+    for name, new_result in new_results.items():
+        base_result = base_results.get(name)
+        if base_result is None:
+            click.echo(f"{name:<50} {'new':>10}")
+            continue
+
+        ops = _change(base_result.ops_per_second, new_result.ops_per_second)
+        cpu = _change(base_result.cpu_seconds_per_op, new_result.cpu_seconds_per_op)
+        peak = _change(base_result.peak_bytes_per_op, new_result.peak_bytes_per_op)
+        click.echo(f"{name:<50} {ops:>10} {cpu:>10} {peak:>10}")
+
+    for name in base_results.keys() - new_results.keys():
+        click.echo(f"{name:<50} {'removed':>10}")
+
+
+@app.command()
+@click.option("--rate", default=50.0, help="Updates per second")
+@click.option("--duration", default=30.0, help="Seconds to generate updates for")
+@click.option("--inline-ratio", default=0.3, help="Share of inline queries")
+@click.option("--distinct-urls", default=1000, help="Size of the URL pool")
+@click.option("--users", default=100, help="Number of distinct users")
+@click.option("--chats", default=50, help="Number of distinct group chats")
+@click.option("--spoiler-rate", default=0.1, help="Share of URLs in spoilers")
+@click.option("--songlink-median", default=0.3, help="Median song.link latency")
+@click.option("--songlink-p99", default=2.0, help="p99 song.link latency")
+@click.option("--error-rate", default=0.01, help="Share of 5xx responses")
+@click.option("--rate-limit-rate", default=0.0, help="Share of 429 responses")
+@click.option("--payload-padding", default=0, help="Extra bytes per response")
+@click.option("--telegram-median", default=0.05, help="Median Bot API latency")
+@click.option("--telegram-p99", default=0.5, help="p99 Bot API latency")
+@click.option("--seed", type=int, help="Seed for reproducible runs")
+def load_test(
+    rate: float,
+    duration: float,
+    inline_ratio: float,
+    distinct_urls: int,
+    users: int,
+    chats: int,
+    spoiler_rate: float,
+    songlink_median: float,
+    songlink_p99: float,
+    error_rate: float,
+    rate_limit_rate: float,
+    payload_padding: int,
+    telegram_median: float,
+    telegram_p99: float,
+    seed: int | None,
+) -> None:
+    config = Config.from_env(Env.load(include_default_dotenv=True))
+    options = LoadTestOptions(
+        rate=rate,
+        duration=duration,
+        inline_ratio=inline_ratio,
+        distinct_urls=distinct_urls,
+        users=users,
+        chats=chats,
+        spoiler_rate=spoiler_rate,
+        songlink_latency=LatencyDistribution(median=songlink_median, p99=songlink_p99),
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+        payload_padding=payload_padding,
+        telegram_latency=LatencyDistribution(
+            median=telegram_median,
+            p99=telegram_p99,
+        ),
+        seed=seed,
+    )
+    report = uvloop.run(run_load_test(config, options))
+    click.echo(report)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,141 @@
+import json
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from telegram import Message
+
+from benchmarks.harness import CORPUS_DIR, load_responses
+from benchmarks.legacy_entities import legacy_url_matches
+from songlinker.bot import SongResult
+from songlinker.entities import extract_url_matches
+from songlinker.link_api import LinkApi, LinkResponse
+from songlinker.serialization import unpack_song_data
+from songlinker.workers import _parse_response as _parse_response_in_worker
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Executor
+
+    from songlinker.link_api import SongData
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    func: Callable[[], Any]
+
+
+def load_messages() -> dict[str, Message]:
+    messages = {}
+    for path in sorted((CORPUS_DIR / "messages").glob("*.json")):
+        data = json.loads(path.read_text("utf-8"))
+        messages[path.stem] = Message.de_json(
+            {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": 1, "type": "group", "title": "Benchmark"},
+                **data,
+            },
+            bot=None,
+        )
+
+    return messages
+
+
+def _parse_response_in_pool(executor: Executor, content: bytes) -> SongData | None:
+    # The round trip of WorkerPool.parse_response, without the event loop
+    packed = executor.submit(_parse_response_in_worker, content, False).result()
+    if packed is None:
+        return None
+
+    return unpack_song_data(packed)
+
+
+def _response_benchmarks(
+    api: LinkApi,
+    strict_api: LinkApi,
+    executor: Executor,
+) -> list[Benchmark]:
+    benchmarks = []
+    for name, content in load_responses().items():
+        benchmarks.append(
+            Benchmark(
+                f"parse_response[{name}]",
+                partial(api._parse_response, content),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                f"parse_response_strict[{name}]",
+                partial(strict_api._parse_response, content),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                f"parse_response_worker[{name}]",
+                partial(_parse_response_in_pool, executor, content),
+            )
+        )
+
+        response = LinkResponse.model_validate_json(content)
+        benchmarks.append(
+            Benchmark(
+                f"extract_metadata[{name}]",
+                partial(
+                    strict_api._extract_metadata,
+                    links_by_platform=response.links_by_platform,
+                    entities_by_unique_id=response.entities_by_unique_id,
+                ),
+            )
+        )
+
+        data = api._parse_response(content)
+        if data is None:
+            continue
+
+        result = SongResult(data, is_spoiler=False)
+        benchmarks.append(
+            Benchmark(
+                f"to_message_content[{name}]",
+                result.to_message_content,
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                f"to_inline_result[{name}]",
+                result.to_inline_result,
+            )
+        )
+
+    return benchmarks
+
+
+def _message_benchmarks() -> list[Benchmark]:
+    benchmarks = []
+    for name, message in load_messages().items():
+        benchmarks.append(
+            Benchmark(
+                f"extract_url_matches[{name}]",
+                partial(extract_url_matches, message.text or "", message.entities),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                f"extract_url_matches_legacy[{name}]",
+                partial(legacy_url_matches, message),
+            )
+        )
+
+    return benchmarks
+
+
+def collect(
+    api: LinkApi,
+    strict_api: LinkApi,
+    executor: Executor,
+) -> list[Benchmark]:
+    return [
+        *_response_benchmarks(api, strict_api, executor),
+        *_message_benchmarks(),
+    ]
@@ -0,0 +1,103 @@
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+@dataclass(frozen=True, kw_only=True)
+class Measurement:
+    name: str
+    ops_per_second: float
+    # Peak of traced memory during a single call
+    peak_bytes_per_op: float
+    # Memory that is still allocated after a call
+    retained_bytes_per_op: float
+    # CPU time of this process only, without work done in other processes.
+    # Missing in results of older versions.
+    cpu_seconds_per_op: float = 0.0
+
+    def format(self) -> str:
+        return (
+            f"{self.name:<50} {self.ops_per_second:>12,.0f} ops/s"
+            f" {self.cpu_seconds_per_op * 1_000_000:>8,.1f} us CPU/op"
+            f" {self.peak_bytes_per_op:>10,.0f} B peak/op"
+            f" {self.retained_bytes_per_op:>8,.0f} B retained/op"
+        )
+
+
+def load_responses() -> dict[str, bytes]:
+    return {
+        path.stem: path.read_bytes().strip()
+        for path in sorted((CORPUS_DIR / "responses").glob("*.json"))
+    }
+
+
+def _ops_per_second(
+    func: Callable[[], Any],
+    *,
+    min_time: float,
+) -> tuple[float, float]:
+    """
+    Returns the operations per second and the CPU seconds per operation.
+    """
+    # Double the number of iterations until the measurement takes long enough
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        for _ in range(iterations):
+            func()
+        cpu_time = time.process_time() - cpu_start
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return iterations / elapsed, cpu_time / iterations
+
+        iterations *= 2
+
+
+def _memory(func: Callable[[], Any], *, iterations: int) -> tuple[float, float]:
+    peak_total = 0
+    retained_total = 0
+    results = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            # Keep the result alive to count it as retained
+            results.append(func())
+            after, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+            retained_total += after - before
+    finally:
+        tracemalloc.stop()
+
+    return peak_total / iterations, retained_total / iterations
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    *,
+    min_time: float = 0.5,
+    memory_iterations: int = 100,
+) -> Measurement:
+    # Warm up caches (e.g. pydantic validators, interned strings)
+    func()
+
+    ops_per_second, cpu_seconds_per_op = _ops_per_second(func, min_time=min_time)
+    peak, retained = _memory(func, iterations=memory_iterations)
+
+    return Measurement(
+        name=name,
+        ops_per_second=ops_per_second,
+        peak_bytes_per_op=peak,
+        retained_bytes_per_op=retained,
+        cpu_seconds_per_op=cpu_seconds_per_op,
+    )
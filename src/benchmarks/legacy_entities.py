@@ -0,0 +1,75 @@
+"""
+The URL extraction of the message handler before extract_url_matches, kept as
+a baseline for the benchmarks.
+"""
+
+import dataclasses
+from typing import TYPE_CHECKING
+
+from songlinker.entities import EntityMatch, EntityPosition
+
+if TYPE_CHECKING:
+    from telegram import Message
+
+
+def _merge(match: EntityMatch, other: EntityMatch) -> EntityMatch:
+    return EntityMatch(
+        position=match.position,
+        url=other.url or match.url,
+        is_spoiler=other.is_spoiler or match.is_spoiler,
+    )
+
+
+def _contains(match: EntityMatch, position: EntityPosition) -> bool:
+    own = match.position
+    return own.offset <= position.offset and position.end <= own.end
+
+
+def _spoil_if_match(
+    match: EntityMatch,
+    spoiler_matches: list[EntityMatch],
+) -> EntityMatch:
+    if match.is_spoiler:
+        return match
+
+    if any(_contains(spoiler, match.position) for spoiler in spoiler_matches):
+        return dataclasses.replace(match, is_spoiler=True)
+
+    return match
+
+
+def legacy_url_matches(message: Message) -> list[EntityMatch]:
+    entity_by_position: dict[EntityPosition, EntityMatch] = {}
+    for entity in message.entities:
+        position = EntityPosition(offset=entity.offset, length=entity.length)
+        match entity.type:
+            case "url":
+                entity_match = EntityMatch(
+                    position=position,
+                    url=message.parse_entity(entity),
+                )
+            case "text_link":
+                entity_match = EntityMatch(position=position, url=entity.url)
+            case "spoiler":
+                entity_match = EntityMatch(position=position, is_spoiler=True)
+            case _:
+                continue
+
+        existing_match = entity_by_position.get(position)
+        if existing_match is None:
+            entity_by_position[position] = entity_match
+        else:
+            entity_by_position[position] = _merge(existing_match, entity_match)
+
+    spoiler_matches = [
+        match for match in entity_by_position.values() if match.url is None
+    ]
+
+    return [
+        _spoil_if_match(match, spoiler_matches)
+        for match in sorted(
+            entity_by_position.values(),
+            key=lambda match: match.position.offset,
+        )
+        if match.url is not None and ("song.link" not in match.require_url())
+    ]
@@ -0,0 +1,417 @@
+"""
+Drives the update handlers of a bot at a target rate, with song.link and the
+Telegram Bot API replaced by local stand-ins.
+"""
+
+import asyncio
+import json
+import math
+import random
+import statistics
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, cast
+
+import httpx
+from telegram import InlineQuery, Update
+from telegram.request import BaseRequest
+
+from benchmarks.harness import load_responses
+from songlinker.bot import Bot
+
+if TYPE_CHECKING:
+    from telegram import Bot as TelegramBot
+
+    from songlinker.config import Config
+
+# z-score of the 99th percentile of the standard normal distribution
+_Z_99 = 2.326
+_BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+_BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Songlinker",
+    "username": "songlinker_load_test_bot",
+}
+
+
+@dataclass(frozen=True, kw_only=True)
+class LatencyDistribution:
+    """
+    A log-normal latency distribution, described by its median and 99th
+    percentile in seconds.
+    """
+
+    median: float
+    p99: float
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+
+        sigma = math.log(max(self.p99, self.median) / self.median) / _Z_99
+        return rng.lognormvariate(math.log(self.median), sigma)
+
+
+class FakeSongLinkTransport(httpx.AsyncBaseTransport):
+    """
+    Answers song.link requests with responses from the benchmark corpus.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: LatencyDistribution,
+        error_rate: float,
+        rate_limit_rate: float,
+        payload_padding: int,
+        rng: random.Random,
+    ):
+        self._latency = latency
+        self._error_rate = error_rate
+        self._rate_limit_rate = rate_limit_rate
+        self._rng = rng
+        self._payloads = [
+            _pad(content, payload_padding) for content in load_responses().values()
+        ]
+        self.status_codes: Counter[int] = Counter()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self._latency.sample(self._rng))
+
+        roll = self._rng.random()
+        if roll < self._error_rate:
+            response = httpx.Response(httpx.codes.BAD_GATEWAY)
+        elif roll < self._error_rate + self._rate_limit_rate:
+            response = httpx.Response(
+                httpx.codes.TOO_MANY_REQUESTS,
+                headers={"Retry-After": "1"},
+            )
+        else:
+            response = httpx.Response(
+                httpx.codes.OK,
+                content=self._rng.choice(self._payloads),
+                headers={"Content-Type": "application/json"},
+            )
+
+        self.status_codes[int(response.status_code)] += 1
+        return response
+
+
+def _pad(content: bytes, padding: int) -> bytes:
+    if padding <= 0:
+        return content
+
+    # Unknown fields are ignored by the parsers, but still have to be read
+    data = json.loads(content)
+    data["padding"] = "x" * padding
+    return json.dumps(data).encode("utf-8")
+
+
+class FakeTelegramRequest(BaseRequest):
+    """
+    Answers Bot API requests without sending them anywhere.
+    """
+
+    def __init__(self, *, latency: LatencyDistribution, rng: random.Random):
+        super().__init__()
+        self._latency = latency
+        self._rng = rng
+        self._message_ids = iter(range(1, 2**31))
+        self.methods: Counter[str] = Counter()
+        self.answered_inline_queries: set[str] = set()
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Any = None,
+        read_timeout: Any = None,
+        write_timeout: Any = None,
+        connect_timeout: Any = None,
+        pool_timeout: Any = None,
+    ) -> tuple[int, bytes]:
+        await asyncio.sleep(self._latency.sample(self._rng))
+
+        api_method = url.rsplit("/", 1)[-1]
+        self.methods[api_method] += 1
+        if api_method == "answerInlineQuery" and request_data is not None:
+            query_id = request_data.parameters["inline_query_id"]
+            self.answered_inline_queries.add(str(query_id))
+
+        result: Any
+        match api_method:
+            case "getMe":
+                result = _BOT_USER
+            case "sendMessage":
+                result = {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": 1, "type": "group", "title": "Load test"},
+                    "from": _BOT_USER,
+                }
+            case _:
+                result = True
+
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
+
+
+class UpdateGenerator:
+    """
+    Generates synthetic updates with music URLs from a fixed pool, so the
+    share of cache hits can be controlled with the size of the pool. Messages
+    are spread over a pool of group chats.
+    """
+
+    def __init__(
+        self,
+        bot: TelegramBot,
+        *,
+        distinct_urls: int,
+        users: int,
+        chats: int,
+        spoiler_rate: float,
+        rng: random.Random,
+    ):
+        self._bot = bot
+        self._distinct_urls = distinct_urls
+        self._users = users
+        self._chats = chats
+        self._spoiler_rate = spoiler_rate
+        self._rng = rng
+        self._update_ids = iter(range(1, 2**31))
+
+    def _url(self) -> str:
+        index = self._rng.randrange(self._distinct_urls)
+        track_id = ""
+        for _ in range(22):
+            index, digit = divmod(index, len(_BASE62))
+            track_id += _BASE62[digit]
+
+        return f"https://open.spotify.com/track/{track_id}"
+
+    def _user(self) -> dict[str, Any]:
+        user_id = 1000 + self._rng.randrange(self._users)
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+    def _chat(self) -> dict[str, Any]:
+        # Group chats have negative IDs
+        chat_id = -1000 - self._rng.randrange(self._chats)
+        return {"id": chat_id, "type": "group", "title": f"Chat {chat_id}"}
+
+    def message(self) -> Update:
+        update_id = next(self._update_ids)
+        text = "Listen to this:"
+        entities = []
+        for _ in range(self._rng.randint(1, 3)):
+            url = self._url()
+            text += " "
+            # The URLs are ASCII, so the UTF-16 offsets equal the string offsets
+            entities.append({"type": "url", "offset": len(text), "length": len(url)})
+            if self._rng.random() < self._spoiler_rate:
+                entities.append(
+                    {"type": "spoiler", "offset": len(text), "length": len(url)}
+                )
+            text += url
+
+        data = {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": self._chat(),
+                "from": self._user(),
+                "text": text,
+                "entities": entities,
+            },
+        }
+        return Update.de_json(data, self._bot)
+
+    def inline_query(self) -> Update:
+        update_id = next(self._update_ids)
+        data = {
+            "update_id": update_id,
+            "inline_query": {
+                "id": str(update_id),
+                "from": self._user(),
+                "query": self._url(),
+                "offset": "",
+            },
+        }
+        return Update.de_json(data, self._bot)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HandlerReport:
+    name: str
+    completed: int
+    errors: int
+    throughput: float
+    latencies: list[float]
+
+    def format(self) -> str:
+        if len(self.latencies) < 2:
+            return f"{self.name:<15} {self.completed:>8} completed"
+
+        percentiles = statistics.quantiles(self.latencies, n=100, method="inclusive")
+        p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+        return (
+            f"{self.name:<15} {self.completed:>8} completed {self.errors:>6} errors"
+            f" {self.throughput:>8.1f}/s"
+            f"  p50 {p50 * 1000:>8.1f}ms"
+            f"  p95 {p95 * 1000:>8.1f}ms"
+            f"  p99 {p99 * 1000:>8.1f}ms"
+            f"  max {max(self.latencies) * 1000:>8.1f}ms"
+        )
+
+
+@dataclass(frozen=True, kw_only=True)
+class LoadTestOptions:
+    rate: float
+    duration: float
+    inline_ratio: float
+    distinct_urls: int
+    users: int
+    chats: int
+    spoiler_rate: float
+    songlink_latency: LatencyDistribution
+    error_rate: float
+    rate_limit_rate: float
+    payload_padding: int
+    telegram_latency: LatencyDistribution
+    seed: int | None
+
+
+async def run_load_test(config: Config, options: LoadTestOptions) -> str:
+    # The synthetic song data must never end up in a real cache
+    config = replace(
+        config,
+        persistent_cache_path=None,
+        shared_cache=None,
+        cache_preload_path=None,
+    )
+    rng = random.Random(options.seed)
+    transport = FakeSongLinkTransport(
+        latency=options.songlink_latency,
+        error_rate=options.error_rate,
+        rate_limit_rate=options.rate_limit_rate,
+        payload_padding=options.payload_padding,
+        rng=rng,
+    )
+    telegram_request = FakeTelegramRequest(latency=options.telegram_latency, rng=rng)
+    bot = Bot(config, telegram_request=telegram_request, songlink_transport=transport)
+    generator = UpdateGenerator(
+        bot._bot,
+        distinct_urls=options.distinct_urls,
+        users=options.users,
+        chats=options.chats,
+        spoiler_rate=options.spoiler_rate,
+        rng=rng,
+    )
+
+    latencies: dict[str, list[float]] = {"message": [], "inline_query": []}
+    errors: Counter[str] = Counter()
+    # Inline queries that were never answered, by reason
+    unanswered: Counter[str] = Counter()
+
+    async def _timed_inline_query(update: Update) -> None:
+        start = time.perf_counter()
+        try:
+            await bot._on_inline_query(update, cast(Any, None))
+        except Exception:
+            errors["inline_query"] += 1
+            return
+
+        duration = time.perf_counter() - start
+        inline_query = cast(InlineQuery, update.inline_query)
+        # The handler returns normally for dropped queries, too
+        if inline_query.id in telegram_request.answered_inline_queries:
+            latencies["inline_query"].append(duration)
+        elif duration >= config.inline_query_timeout_seconds:
+            unanswered["timed out"] += 1
+        else:
+            unanswered["superseded"] += 1
+
+    # Messages go through the fair scheduler like in production, so their
+    # latency is measured from submission and includes the time spent queued
+    submitted_at: dict[int, float] = {}
+    handle_message = bot._on_message_update
+
+    async def _timed_message(update: Update, context: Any) -> None:
+        try:
+            await handle_message(update, context)
+        except Exception:
+            errors["message"] += 1
+            raise
+        finally:
+            start = submitted_at.pop(update.update_id)
+            latencies["message"].append(time.perf_counter() - start)
+
+    # The scheduled jobs look up the handler when they start
+    bot._on_message_update = _timed_message  # type: ignore[method-assign]
+
+    await bot._bot.initialize()
+    await bot._init()
+    try:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        total = int(options.rate * options.duration)
+        async with asyncio.TaskGroup() as tg:
+            # Open loop: updates arrive at the target rate, regardless of how
+            # long the previous ones take
+            for index in range(total):
+                delay = start + index / options.rate - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if rng.random() < options.inline_ratio:
+                    update = generator.inline_query()
+                    tg.create_task(_timed_inline_query(update))
+                else:
+                    update = generator.message()
+                    submitted_at[update.update_id] = time.perf_counter()
+                    await bot._schedule_message_update(update, cast(Any, None))
+
+            offered_rate = total / (loop.time() - start)
+
+        scheduler = bot._message_scheduler
+        while scheduler.queued or scheduler.running:
+            await asyncio.sleep(0.01)
+
+        elapsed = loop.time() - start
+    finally:
+        await bot._close()
+        await bot._bot.shutdown()
+
+    lines = [
+        f"Offered {offered_rate:.1f} updates/s (target {options.rate:.1f}/s),"
+        f" completed in {elapsed:.1f}s",
+    ]
+    for name, handler_latencies in latencies.items():
+        report = HandlerReport(
+            name=name,
+            completed=len(handler_latencies),
+            errors=errors[name],
+            throughput=len(handler_latencies) / elapsed,
+            latencies=handler_latencies,
+        )
+        lines.append(report.format())
+
+    # Jobs that never ran were shed by the scheduler
+    lines.append(f"Shed messages: {len(submitted_at)}")
+    lines.append(f"Unanswered inline queries: {dict(unanswered)}")
+    lines.append(f"song.link responses: {dict(transport.status_codes)}")
+    lines.append(f"Bot API calls: {dict(telegram_request.methods)}")
+    return "\n".join(lines)
@@ -1,21 +1,31 @@
 import asyncio
 import logging
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
-import sentry_sdk
 import uvloop
 from bs_config import Env
 
-from songlinker.bot import Bot
 from songlinker.config import Config
+from songlinker.logs import apply_log_levels, enqueue_handlers
+from songlinker.startup import (
+    LOAD_CONFIG,
+    STARTUP_STEPS,
+    profile_imports,
+    startup_step,
+)
 from songlinker.telemetry import setup_telemetry
 
+if TYPE_CHECKING:
+    from songlinker.sqlite_cache import SqliteCache
+
 _LOG = logging.getLogger(__package__)
 
 
-def _setup_logging() -> None:
+def _setup_logging(config: Config) -> None:
     logging.basicConfig()
-    _LOG.level = logging.DEBUG
+    apply_log_levels(config.log_levels)
 
 
 def _setup_sentry(config: Config) -> None:
@@ -24,6 +34,8 @@ def _setup_sentry(config: Config) -> None:
         _LOG.warning("No Sentry DSN found")
         return
 
+    import sentry_sdk
+
     sentry_sdk.init(
         dsn,
         release=config.app_version,
@@ -35,21 +47,147 @@ def _setup_sentry(config: Config) -> None:
 def app(ctx: click.Context) -> None:
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
-    env = Env.load(include_default_dotenv=True)
-    config = Config.from_env(env)
-    _setup_logging()
-    _setup_sentry(config)
-    setup_telemetry(config)
+    with startup_step("config"):
+        env = Env.load(include_default_dotenv=True)
+        config = Config.from_env(env)
+    with startup_step("logging"):
+        _setup_logging(config)
+    with startup_step("sentry"):
+        _setup_sentry(config)
+    with startup_step("telemetry"):
+        setup_telemetry(config)
+    if config.log_queue_size > 0:
+        # Done last to also move the handlers added by the telemetry setup
+        enqueue_handlers(logging.root, max_size=config.log_queue_size)
 
     ctx.obj = config
 
 
 @app.command()
+@click.option(
+    "--workers",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Number of processes that parse song.link responses."
+    " With 0, parsing happens on the event loop. Handing a typical response to"
+    " a worker costs the event loop more CPU than parsing it (see the CPU/op"
+    " of the parse_response_worker benchmark), so only enable this if"
+    " responses are several hundred kilobytes large.",
+)
 @click.pass_obj
-def handle_updates(obj: Config) -> None:
-    bot = Bot(obj)
+def handle_updates(obj: Config, workers: int) -> None:
+    from songlinker.bot import Bot
+
+    bot = Bot(obj, workers=workers)
     bot.handle_updates()
 
 
+@app.group()
+def cache() -> None:
+    """
+    Moves the persistent cache between environments as snapshot files.
+    """
+
+
+def _open_persistent_cache(config: Config) -> SqliteCache:
+    # Like the cache module, this pulls in the song data models
+    from songlinker.sqlite_cache import SqliteCache
+
+    path = config.persistent_cache_path
+    if path is None:
+        raise click.UsageError("PERSISTENT_CACHE_PATH is not set")
+
+    return SqliteCache(
+        path,
+        ttl=config.persistent_cache_ttl_seconds,
+        compaction_interval=config.persistent_cache_compaction_interval_seconds,
+    )
+
+
+async def _export_cache(config: Config, path: Path) -> int:
+    persistent_cache = _open_persistent_cache(config)
+    await persistent_cache.open()
+    try:
+        return await persistent_cache.export_snapshot(path)
+    finally:
+        await persistent_cache.close()
+
+
+async def _import_cache(config: Config, path: Path) -> int:
+    persistent_cache = _open_persistent_cache(config)
+    await persistent_cache.open()
+    try:
+        return await persistent_cache.import_snapshot(path)
+    finally:
+        await persistent_cache.close()
+
+
+@cache.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, path_type=Path))
+@click.pass_obj
+def export_cache(obj: Config, path: Path) -> None:
+    """
+    Writes the live entries of the persistent cache to a snapshot, most
+    frequently used first.
+    """
+    from songlinker.cache import CacheException
+
+    try:
+        count = asyncio.run(_export_cache(obj, path))
+    except (CacheException, OSError) as e:
+        raise click.ClickException(f"Could not export cache: {e}") from e
+
+    click.echo(f"Exported {count} entries to {path}")
+
+
+@cache.command("import")
+@click.argument(
+    "path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.pass_obj
+def import_cache(obj: Config, path: Path) -> None:
+    """
+    Adds the unexpired entries of a snapshot to the persistent cache.
+    """
+    from songlinker.cache import CacheException
+
+    try:
+        count = asyncio.run(_import_cache(obj, path))
+    except (CacheException, OSError) as e:
+        raise click.ClickException(f"Could not import cache: {e}") from e
+
+    click.echo(f"Imported {count} entries from {path}")
+
+
+@app.command()
+@click.option("--top", default=15, show_default=True, help="Packages to show")
+@click.pass_obj
+def startup_profile(obj: Config, top: int) -> None:
+    """
+    Reports how long the imports and each step of the startup take.
+    """
+    with startup_step("import bot"):
+        from songlinker.bot import Bot
+    with startup_step("create bot"):
+        Bot(obj)
+
+    import_times = profile_imports(
+        ["songlinker.__main__", "songlinker.bot"],
+        statements=[LOAD_CONFIG],
+    )
+    click.echo("Import time by package (fresh interpreter):")
+    slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)
+    for package, seconds in slowest[:top]:
+        click.echo(f"  {package:<40} {seconds * 1000:>8.1f} ms")
+    total = sum(import_times.values())
+    click.echo(f"  {'total':<40} {total * 1000:>8.1f} ms")
+
+    click.echo("Startup steps (this process):")
+    for step, seconds in STARTUP_STEPS.items():
+        click.echo(f"  {step:<40} {seconds * 1000:>8.1f} ms")
+
+
 if __name__ == "__main__":
     app()
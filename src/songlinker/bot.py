@@ -1,23 +1,26 @@
 import asyncio
+import hashlib
 import logging
 import signal
-import uuid
+import time
 from collections import OrderedDict
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, NamedTuple, Self, cast
+from typing import TYPE_CHECKING, Any
 from urllib import parse
 
 from bs_nats_updater import create_updater
-from opentelemetry import trace
+from opentelemetry import metrics, trace
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 from telegram import (
     Bot as TelegramBot,
 )
 from telegram import (
+    InlineQuery,
     InlineQueryResult,
     InlineQueryResultArticle,
     InputTextMessageContent,
     LinkPreviewOptions,
+    Message,
     MessageOriginHiddenUser,
     MessageOriginUser,
     Update,
@@ -30,48 +33,113 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-
-from songlinker.link_api import IoException, LinkApi, Platform, SongData
-from songlinker.telemetry import InstrumentedHttpxRequest
+from telegram.request import HTTPXRequest
+
+from songlinker.cache import (
+    CacheBackend,
+    CacheException,
+    LookupCache,
+    LruCache,
+    observe_cache_stats,
+)
+from songlinker.canonical import cache_key
+from songlinker.entities import EntityMatch, EntityPosition, extract_url_matches
+from songlinker.hosts import HostClassifier, is_music_url
+from songlinker.http_client import prewarm
+from songlinker.link_api import (
+    IoException,
+    LinkApi,
+    Platform,
+    SongData,
+    UnavailableException,
+    UnresolvableReason,
+    observe_link_api,
+)
+from songlinker.metrics import DURATION_BUCKETS
+from songlinker.nats_cache import NatsKvCache
+from songlinker.rate_limit import Priority, RateLimiter
+from songlinker.resilience import CircuitBreaker, RetryPolicy
+from songlinker.scheduler import FairScheduler, observe_scheduler
+from songlinker.snapshot import read_snapshot_head
+from songlinker.sqlite_cache import SqliteCache
+from songlinker.tasks import LatestTaskPerKey
+from songlinker.workers import WorkerPool
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator
+    from pathlib import Path
+
+    import httpx
+    from telegram.request import BaseRequest
 
     from songlinker.config import Config
+    from songlinker.http_client import HttpClientConfig
 
 _LOG = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
+
+_handler_duration = meter.create_histogram(
+    "songlinker.handler.duration",
+    unit="s",
+    description="Duration of update handlers",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+_messages = meter.create_counter(
+    "songlinker.messages",
+    description="Handled messages by outcome",
+)
+
+_TELEGRAM_ORIGIN = "https://api.telegram.org"
+
+# Empty results may be caused by temporary errors, so they are only cached briefly
+_EMPTY_INLINE_RESULT_CACHE_TIME = 10
+
+
+def _count_message(message: Message, outcome: str) -> None:
+    _messages.add(
+        1,
+        {"outcome": outcome, "forwarded": message.forward_origin is not None},
+    )
 
 
 @asynccontextmanager
 async def telegram_span(*, update: Update, name: str) -> AsyncIterator[trace.Span]:
+    start = time.monotonic()
     with tracer.start_as_current_span(name) as span:
-        span.set_attribute(
-            "telegram.update_keys",
-            list(update.to_dict(recursive=False).keys()),
-        )
-        span.set_attribute("telegram.update_id", update.update_id)
+        # Computing the attributes is relatively expensive
+        if span.is_recording():
+            span.set_attribute(
+                "telegram.update_keys",
+                list(update.to_dict(recursive=False).keys()),
+            )
+            span.set_attribute("telegram.update_id", update.update_id)
 
-        if message := update.effective_message:
-            span.set_attribute("telegram.message_id", message.message_id)
-            span.set_attribute("telegram.message_timestamp", message.date.isoformat())
+            if message := update.effective_message:
+                span.set_attribute("telegram.message_id", message.message_id)
+                span.set_attribute(
+                    "telegram.message_timestamp", message.date.isoformat()
+                )
 
-        if chat := update.effective_chat:
-            span.set_attribute("telegram.chat_id", chat.id)
-            span.set_attribute("telegram.chat_type", chat.type)
-            if chat_name := chat.effective_name:
-                span.set_attribute("telegram.chat_name", chat_name)
+            if chat := update.effective_chat:
+                span.set_attribute("telegram.chat_id", chat.id)
+                span.set_attribute("telegram.chat_type", chat.type)
+                if chat_name := chat.effective_name:
+                    span.set_attribute("telegram.chat_name", chat_name)
 
-        if user := update.effective_user:
-            span.set_attribute("telegram.user_id", user.id)
-            span.set_attribute("telegram.user_full_name", user.full_name)
-            if user_username := user.username:
-                span.set_attribute("telegram.user_username", user_username)
+            if user := update.effective_user:
+                span.set_attribute("telegram.user_id", user.id)
+                span.set_attribute("telegram.user_full_name", user.full_name)
+                if user_username := user.username:
+                    span.set_attribute("telegram.user_username", user_username)
 
-        if query := update.inline_query:
-            span.set_attribute("telegram.query_id", query.id)
+            if query := update.inline_query:
+                span.set_attribute("telegram.query_id", query.id)
 
-        yield span
+        try:
+            yield span
+        finally:
+            _handler_duration.record(time.monotonic() - start, {"handler": name})
 
 
 class SongResult:
@@ -102,6 +170,12 @@ class SongResult:
 
         return f"{header}\n[{links}]"
 
+    @property
+    def inline_result_id(self) -> str:
+        # Stable across queries and restarts, so Telegram can reuse the result
+        page = self.data.links.page.encode("utf-8")
+        return hashlib.blake2b(page, digest_size=16).hexdigest()
+
     def to_inline_result(self) -> InlineQueryResult:
         artist = self.data.metadata.artist_name
         title = self.data.metadata.title
@@ -113,7 +187,7 @@ class SongResult:
         link_preview_options = LinkPreviewOptions(is_disabled=True)
 
         if thumbnail := self.data.metadata.thumbnail:
-            _LOG.info(
+            _LOG.debug(
                 "Using thumbnail URL: %s (type: %s)",
                 thumbnail.url,
                 type(thumbnail.url),
@@ -130,7 +204,7 @@ class SongResult:
             )
 
         return InlineQueryResultArticle(
-            id=str(uuid.uuid4()),
+            id=self.inline_result_id,
             title=result_title,
             url=self.data.links.page,
             input_message_content=InputTextMessageContent(
@@ -142,128 +216,204 @@ class SongResult:
         )
 
 
-class EntityPosition(NamedTuple):
-    offset: int
-    length: int
-
-
-@dataclass(frozen=True)
-class EntityMatch:
-    position: EntityPosition
-    url: str | None = None
-    is_spoiler: bool = False
-
-    def require_url(self) -> str:
-        url = self.url
-        if not url:
-            raise ValueError("url is None")
-
-        return url
-
-    def merge(self, other: Self) -> Self:
-        if other.position != self.position:
-            raise ValueError("Can't merge entities with different positions")
+def _create_cache_backend(config: Config) -> CacheBackend | None:
+    path = config.persistent_cache_path
+    if shared_cache := config.shared_cache:
+        if path is not None:
+            _LOG.warning("Ignoring persistent cache path in favor of shared cache")
+        return NatsKvCache(shared_cache)
 
-        if other.url is not None and self.url is not None:
-            raise ValueError("Can't overwrite url")
+    if path is None:
+        return None
 
-        if other.is_spoiler and self.is_spoiler:
-            raise ValueError("Can't overwrite is_spoiler")
-
-        return cast(
-            Self,
-            EntityMatch(
-                position=self.position,
-                url=other.url or self.url,
-                is_spoiler=other.is_spoiler or self.is_spoiler,
-            ),
-        )
-
-    def with_spoiler(self) -> Self:
-        if self.is_spoiler:
-            return self
-
-        return cast(
-            Self,
-            EntityMatch(
-                position=self.position,
-                url=self.url,
-                is_spoiler=True,
-            ),
-        )
+    return SqliteCache(
+        path,
+        ttl=config.persistent_cache_ttl_seconds,
+        compaction_interval=config.persistent_cache_compaction_interval_seconds,
+    )
 
-    def contains(self, position: EntityPosition) -> bool:
-        own = self.position
-        if position.offset < own.offset:
-            # Their start is before our start
-            return False
 
-        if (position.offset + position.length) > (own.offset + own.length):
-            # Their end is after our end
-            return False
+class InstrumentedHttpxRequest(HTTPXRequest):
+    def _build_client(self) -> httpx.AsyncClient:
+        client = super()._build_client()
+        HTTPXClientInstrumentor().instrument_client(client)
+        return client
 
-        return True
+    async def prewarm(self, url: str, *, connections: int) -> None:
+        await prewarm(self._client, url, connections=connections)
 
 
-def _spoil_if_match(
-    match: EntityMatch,
-    spoiler_matches: list[EntityMatch],
-) -> EntityMatch:
-    if match.is_spoiler:
-        return match
-
-    if any(spoiler.contains(match.position) for spoiler in spoiler_matches):
-        return match.with_spoiler()
-
-    return match
-
-
-def _collapse_entities(
-    entity_by_position: dict[EntityPosition, EntityMatch],
-) -> list[EntityMatch]:
-    spoiler_matches = [
-        match for match in entity_by_position.values() if match.url is None
-    ]
-
-    return [
-        _spoil_if_match(match, spoiler_matches)
-        for match in sorted(
-            entity_by_position.values(),
-            key=lambda match: match.position.offset,
-        )
-        if match.url is not None and ("song.link" not in match.require_url())
-    ]
+def _create_telegram_request(config: HttpClientConfig) -> BaseRequest:
+    return InstrumentedHttpxRequest(
+        connection_pool_size=config.max_connections,
+        connect_timeout=config.connect_timeout_seconds,
+        read_timeout=config.read_timeout_seconds,
+        write_timeout=config.write_timeout_seconds,
+        pool_timeout=config.pool_timeout_seconds,
+        http_version="2" if config.http2 else "1.1",
+        httpx_kwargs={"limits": config.limits()},
+    )
 
 
 class Bot:
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self,
+        config: Config,
+        *,
+        telegram_request: BaseRequest | None = None,
+        songlink_transport: httpx.AsyncBaseTransport | None = None,
+        workers: int = 0,
+    ) -> None:
+        if telegram_request is None:
+            telegram_request = _create_telegram_request(config.telegram_http)
+
         bot = TelegramBot(
             token=config.telegram_api_key,
-            request=InstrumentedHttpxRequest(connection_pool_size=2),
+            request=telegram_request,
         )
         self._bot = bot
-        self._link_api = LinkApi(config.songlinker_api_key)
+        self._telegram_request = telegram_request
+        self._telegram_http = config.telegram_http
+        self._inline_lookups: LatestTaskPerKey[int] = LatestTaskPerKey()
+        self._message_scheduler: FairScheduler[int] = FairScheduler(
+            max_concurrency=config.message_concurrency,
+            max_queue_size=config.message_queue_size_per_chat,
+            max_age=config.message_max_age_seconds,
+        )
+        self._message_lookup_concurrency = config.message_lookup_concurrency
+        self._message_lookup_timeout = config.message_lookup_timeout_seconds
+        self._inline_semaphore = asyncio.Semaphore(config.inline_query_concurrency)
+        self._inline_query_timeout = config.inline_query_timeout_seconds
+        self._inline_cache_time = config.inline_cache_time_seconds
+        self._inline_results: LruCache[str, InlineQueryResult] = LruCache(
+            max_size=config.cache_max_size,
+            ttl=config.cache_ttl_seconds,
+        )
+        self._host_classifier = HostClassifier(
+            unknown_host_sample_rate=config.unknown_host_sample_percent / 100,
+        )
+        self._worker_pool = WorkerPool(workers=workers) if workers > 0 else None
+        self._link_api = LinkApi(
+            config.songlinker_api_key,
+            rate_limiter=RateLimiter(
+                rate=config.songlink_requests_per_second,
+                burst=config.songlink_burst,
+                max_concurrency=config.songlink_max_concurrency,
+                latency_threshold=config.songlink_latency_threshold_seconds,
+            ),
+            retry_policy=RetryPolicy(
+                max_attempts=config.songlink_max_attempts,
+                base_delay=0.2,
+                max_delay=2,
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=config.songlink_circuit_failure_threshold,
+                reset_timeout=config.songlink_circuit_reset_timeout_seconds,
+            ),
+            strict_parsing=config.songlink_strict_parsing,
+            http_config=config.songlink_http,
+            transport=songlink_transport,
+            worker_pool=self._worker_pool,
+        )
+        self._cache_preload_path = config.cache_preload_path
+        self._cache_preload_entries = config.cache_preload_entries
+        self._cache_max_size = config.cache_max_size
+        self._song_cache = LookupCache(
+            LruCache(
+                max_size=config.cache_max_size,
+                ttl=config.cache_ttl_seconds,
+            ),
+            LruCache(
+                max_size=config.negative_cache_max_size,
+                ttl=config.negative_cache_ttl_seconds,
+            ),
+            backend=_create_cache_backend(config),
+        )
+        observe_link_api(self._link_api)
+        observe_scheduler(self._message_scheduler)
+        observe_cache_stats(
+            {
+                "songs": self._song_cache.stats,
+                "unresolvable": self._song_cache.unresolvable_stats,
+                "inline_results": self._inline_results.stats,
+            }
+        )
 
         app = (
             Application.builder()
+            .post_init(self._init)
             .post_shutdown(self._close)
             .updater(create_updater(bot, config.nats))
             .build()
         )
         self._app = app
 
-        app.add_handler(InlineQueryHandler(callback=self._on_inline_query))
+        app.add_handler(
+            InlineQueryHandler(
+                callback=self._on_inline_query,
+                block=False,
+            )
+        )
         app.add_handler(
             MessageHandler(
                 filters=filters.TEXT & ~filters.UpdateType.EDITED,
-                callback=self._on_message_update,
-                block=False,
+                # Only queues the update, so there is no need for a task
+                callback=self._schedule_message_update,
             )
         )
 
+    async def _init(self, _: Any = None) -> None:
+        if worker_pool := self._worker_pool:
+            await worker_pool.open()
+        # The backend is optional, the cache falls back to memory if it fails
+        await self._song_cache.open()
+        if path := self._cache_preload_path:
+            await self._preload_cache(path)
+        await asyncio.gather(
+            self._link_api.prewarm(),
+            self._prewarm_telegram(),
+        )
+
+    async def _preload_cache(self, path: Path) -> None:
+        try:
+            entries = await asyncio.to_thread(
+                read_snapshot_head,
+                path,
+                max_entries=self._cache_preload_entries,
+                # More keys would only evict the hottest entries again
+                max_keys=self._cache_max_size,
+            )
+        except (OSError, CacheException) as e:
+            _LOG.error("Could not preload cache from %s", path, exc_info=e)
+            return
+
+        now = time.time()
+        count = 0
+        # Coldest first, so the hottest entries are the last to be evicted
+        for entry in reversed(entries):
+            ttl = entry.expires_at - now
+            if ttl <= 0:
+                continue
+
+            self._song_cache.preload(entry.keys, entry.data, ttl=ttl)
+            count += 1
+        _LOG.info("Preloaded %d cache entries", count)
+
+    async def _prewarm_telegram(self) -> None:
+        request = self._telegram_request
+        if isinstance(request, InstrumentedHttpxRequest):
+            await request.prewarm(
+                _TELEGRAM_ORIGIN,
+                connections=self._telegram_http.prewarm_connections,
+            )
+
     async def _close(self, _: Any = None) -> None:
         _LOG.info("Closing bot")
+        await self._message_scheduler.close()
         await self._link_api.close()
+        await self._song_cache.close()
+        if worker_pool := self._worker_pool:
+            await worker_pool.close()
 
     def handle_updates(self) -> None:
         _LOG.info("Starting bot")
@@ -274,6 +424,22 @@ class Bot:
             ]
         )
 
+    async def _schedule_message_update(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ) -> None:
+        message = update.message
+        if message is None:
+            raise RuntimeError("No message")
+
+        # Chats take turns, so a busy chat can't starve the others
+        self._message_scheduler.submit(
+            message.chat_id,
+            lambda: self._on_message_update(update, context),
+            created_at=message.date.timestamp(),
+        )
+
     async def _on_message_update(
         self,
         update: Update,
@@ -288,6 +454,7 @@ class Bot:
                 if self._bot.username == via_bot.username:
                     _LOG.info("Skipping message that was sent via this bot")
                     span.set_attribute("songlinker.skipped", True)
+                    _count_message(message, "via_bot")
                     return
 
             if forward_origin := message.forward_origin:
@@ -297,6 +464,7 @@ class Bot:
                         if self._bot.username == sender_user.username:
                             _LOG.info("Skipping message forwarded from this bot")
                             span.set_attribute("songlinker.skipped", True)
+                            _count_message(message, "forwarded_from_bot")
                             return
                     case MessageOriginHiddenUser():
                         user_name = forward_origin.sender_user_name
@@ -310,58 +478,30 @@ class Bot:
             if not entities:
                 _LOG.debug("No entities in message")
                 span.set_attribute("songlinker.skipped", True)
+                _count_message(message, "no_entities")
                 return
 
-            entity_by_position: dict[EntityPosition, EntityMatch] = {}
-
-            for entity in entities:
-                position = EntityPosition(
-                    offset=entity.offset,
-                    length=entity.length,
-                )
-
-                entity_match: EntityMatch
-                match entity.type:
-                    case "url":
-                        url = message.parse_entity(entity)
-                        entity_match = EntityMatch(position=position, url=url)
-                    case "text_link":
-                        entity_match = EntityMatch(position=position, url=entity.url)
-                    case "spoiler":
-                        entity_match = EntityMatch(position=position, is_spoiler=True)
-                    case _:
-                        continue
+            url_matches = extract_url_matches(message.text or "", entities)
+            _LOG.debug("Got %d URL matches", len(url_matches))
 
-                existing_match = entity_by_position.get(position)
-                if existing_match is None:
-                    entity_by_position[position] = entity_match
-                else:
-                    entity_by_position[position] = existing_match.merge(entity_match)
-
-            _LOG.debug("Got %d entity matches", len(entity_by_position))
-
-            entity_matches = _collapse_entities(entity_by_position)
+            entity_matches = [
+                match
+                for match in url_matches
+                if self._host_classifier.should_look_up(match.require_url())
+            ]
 
             span.set_attribute("songlinker.url_entity_count", len(entities))
 
             if not entity_matches:
                 _LOG.info("No URLs after filtering")
                 span.set_attribute("songlinker.skipped", True)
+                _count_message(message, "no_urls")
                 return
 
-            tasks: list[asyncio.Task[SongResult | None]] = []
-            async with asyncio.TaskGroup() as tg:
-                for match in entity_matches:
-                    task = tg.create_task(self._build_result(match))
-                    tasks.append(task)
-
-            results = [t.result() for t in tasks]
+            results = await self._build_results(entity_matches)
 
             deduped_results: dict[SongData, SongResult] = OrderedDict()
             for result in results:
-                if result is None:
-                    continue
-
                 old = deduped_results.get(result.data)
 
                 if old is None:
@@ -382,6 +522,7 @@ class Bot:
 
             if not message_contents:
                 _LOG.info("No known songs found")
+                _count_message(message, "no_songs")
                 return
 
             await message.reply_text(
@@ -392,13 +533,14 @@ class Bot:
                 ),
                 disable_notification=True,
             )
+            _count_message(message, "replied")
 
     async def _on_inline_query(
         self,
         update: Update,
         context: ContextTypes.DEFAULT_TYPE,
     ) -> None:
-        async with telegram_span(update=update, name="on_inline_query"):
+        async with telegram_span(update=update, name="on_inline_query") as span:
             inline_query = update.inline_query
             if inline_query is None:
                 raise RuntimeError("No inline query")
@@ -406,42 +548,178 @@ class Bot:
             query_text: str = inline_query.query.strip()
             if not query_text:
                 _LOG.debug("Ignoring empty inline query")
-                await inline_query.answer(results=[])
+                await self._answer_inline_query(inline_query, [])
                 return
 
             try:
                 url = parse.urlparse(query_text)
             except ValueError:
                 _LOG.debug("Received non-URL query")
-                await inline_query.answer(results=[])
+                await self._answer_inline_query(inline_query, [])
                 return
 
             if url.scheme not in ["http", "https"]:
                 _LOG.debug("Received non-HTTP URL")
-                await inline_query.answer(results=[])
+                await self._answer_inline_query(inline_query, [])
+                return
+
+            if not self._host_classifier.should_look_up(query_text):
+                _LOG.debug("Received URL of unknown host")
+                await self._answer_inline_query(inline_query, [])
+                return
+
+            # A newer query of the same user supersedes this one
+            lookup = self._inline_lookups.start(
+                inline_query.from_user.id,
+                self._build_inline_result(query_text),
+            )
+            done, _ = await asyncio.wait([lookup], timeout=self._inline_query_timeout)
+
+            if not done:
+                _LOG.info("Dropping inline query that took too long")
+                span.set_attribute("songlinker.timed_out", True)
+                lookup.cancel()
+                return
+
+            if lookup.cancelled():
+                _LOG.debug("Dropping superseded inline query")
+                span.set_attribute("songlinker.superseded", True)
+                return
+
+            song_result = lookup.result()
+            if song_result is None:
+                await self._answer_inline_query(
+                    inline_query,
+                    [],
+                    cache_time=_EMPTY_INLINE_RESULT_CACHE_TIME,
+                )
                 return
 
-            song_result = await self._build_result(
+            await self._answer_inline_query(
+                inline_query,
+                [self._get_inline_result(song_result)],
+            )
+
+    async def _answer_inline_query(
+        self,
+        inline_query: InlineQuery,
+        results: list[InlineQueryResult],
+        *,
+        cache_time: int | None = None,
+    ) -> None:
+        # The results only depend on the query text, so Telegram may share them
+        await inline_query.answer(
+            results=results,
+            cache_time=self._inline_cache_time if cache_time is None else cache_time,
+            is_personal=False,
+        )
+
+    def _get_inline_result(self, song_result: SongResult) -> InlineQueryResult:
+        key = song_result.inline_result_id
+        result = self._inline_results.get(key)
+        if result is None:
+            result = song_result.to_inline_result()
+            self._inline_results.put(key, result)
+
+        return result
+
+    async def _build_inline_result(self, query_text: str) -> SongResult | None:
+        async with self._inline_semaphore:
+            return await self._build_result(
                 EntityMatch(
                     position=EntityPosition(offset=0, length=len(query_text)),
                     url=query_text,
                 ),
+                priority=Priority.interactive,
             )
 
-            results = [song_result.to_inline_result()] if song_result else []
-            await inline_query.answer(results=results)
+    async def _get_cached(self, key: str) -> SongData | UnresolvableReason | None:
+        data = await self._song_cache.get(key)
+        if data is not None:
+            return data
 
-    async def _build_result(self, entity: EntityMatch) -> SongResult | None:
-        try:
-            data = await self._link_api.lookup_links(entity.require_url())
-        except IoException as e:
-            _LOG.error(
-                f"Could not look up data for URL {entity.require_url()}",
-                exc_info=e,
-            )
-            return None
+        if reason := self._song_cache.get_unresolvable(key):
+            _LOG.debug("Skipping known unresolvable URL (%s)", reason.name)
+            return reason
+
+        return None
+
+    async def _remember(
+        self,
+        url: str,
+        key: str,
+        result: SongData | UnresolvableReason,
+    ) -> None:
+        if isinstance(result, UnresolvableReason):
+            self._song_cache.put_unresolvable(key, result)
+            return
+
+        if not is_music_url(url):
+            _LOG.info("Resolved URL of unknown host: %s", url)
+
+        await self._song_cache.put(key, result)
 
-        if data is None:
+    async def _build_result(
+        self,
+        entity: EntityMatch,
+        *,
+        priority: Priority = Priority.background,
+    ) -> SongResult | None:
+        url = entity.require_url()
+        key = cache_key(url)
+        result = await self._get_cached(key)
+        if result is None:
+            try:
+                result = await self._link_api.resolve(url, key=key, priority=priority)
+            except UnavailableException:
+                _LOG.warning("Skipping lookup because song.link is unavailable")
+                return None
+            except IoException as e:
+                _LOG.error(
+                    f"Could not look up data for URL {url}",
+                    exc_info=e,
+                )
+                return None
+
+            await self._remember(url, key, result)
+
+        if isinstance(result, UnresolvableReason):
             return None
 
-        return SongResult(data, is_spoiler=entity.is_spoiler)
+        return SongResult(result, is_spoiler=entity.is_spoiler)
+
+    async def _build_results(self, entities: list[EntityMatch]) -> list[SongResult]:
+        """
+        Builds the results of multiple entities, looking up each distinct song
+        only once. Entities that can't be resolved (in time) are left out.
+        """
+        keys = [cache_key(entity.require_url()) for entity in entities]
+        unique_keys = list(dict.fromkeys(keys))
+        cached = await asyncio.gather(*(self._get_cached(key) for key in unique_keys))
+        result_by_key = dict(zip(unique_keys, cached, strict=True))
+
+        missing_urls = [
+            entity.require_url()
+            for entity, key in zip(entities, keys, strict=True)
+            if result_by_key[key] is None
+        ]
+        if missing_urls:
+            looked_up = await self._link_api.lookup_many(
+                missing_urls,
+                key=cache_key,
+                max_concurrency=self._message_lookup_concurrency,
+                timeout=self._message_lookup_timeout,
+            )
+            for url, result in zip(missing_urls, looked_up, strict=True):
+                key = cache_key(url)
+                if result is not None and result_by_key[key] is None:
+                    result_by_key[key] = result
+                    await self._remember(url, key, result)
+
+        results = []
+        for entity, key in zip(entities, keys, strict=True):
+            result = result_by_key[key]
+            if isinstance(result, SongData):
+                results.append(SongResult(result, is_spoiler=entity.is_spoiler))
+
+        return results
@@ -0,0 +1,259 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, NamedTuple, Protocol
+
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from songlinker.canonical import cache_key
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Collection, Iterable, Mapping
+
+    from songlinker.link_api import SongData, UnresolvableReason
+
+_LOG = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+class CacheException(Exception):
+    pass
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+
+        return self.hits / total
+
+
+def observe_cache_stats(stats_by_cache: Mapping[str, CacheStats]) -> None:
+    """
+    Exports the stats of the given caches as metrics, labeled by cache name.
+    """
+
+    def _observe(
+        get_value: Callable[[CacheStats], float],
+    ) -> Callable[[CallbackOptions], Iterable[Observation]]:
+        def _callback(options: CallbackOptions) -> Iterable[Observation]:
+            for name, stats in stats_by_cache.items():
+                yield Observation(get_value(stats), {"cache": name})
+
+        return _callback
+
+    meter.create_observable_counter(
+        "songlinker.cache.hits",
+        callbacks=[_observe(lambda stats: stats.hits)],
+    )
+    meter.create_observable_counter(
+        "songlinker.cache.misses",
+        callbacks=[_observe(lambda stats: stats.misses)],
+    )
+    meter.create_observable_counter(
+        "songlinker.cache.evictions",
+        callbacks=[_observe(lambda stats: stats.evictions)],
+    )
+    meter.create_observable_gauge(
+        "songlinker.cache.hit_rate",
+        callbacks=[_observe(lambda stats: stats.hit_rate)],
+    )
+
+
+class _CacheEntry[V](NamedTuple):
+    value: V
+    expires_at: float
+
+
+class LruCache[K, V]:
+    """
+    A bounded in-memory cache with a time-to-live per entry, which defaults to
+    the TTL of the cache and can't exceed it.
+
+    If the cache is full, the least recently used entry is evicted.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[K, _CacheEntry[V]] = OrderedDict()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry.value
+
+    def put(self, key: K, value: V, *, ttl: float | None = None) -> None:
+        if ttl is None or ttl > self._ttl:
+            ttl = self._ttl
+
+        entries = self._entries
+        entries[key] = _CacheEntry(value, self._clock() + ttl)
+        entries.move_to_end(key)
+
+        while len(entries) > self._max_size:
+            entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class CacheBackend(Protocol):
+    async def open(self) -> None: ...
+
+    async def get(self, key: str) -> SongData | None: ...
+
+    async def put(self, keys: Collection[str], data: SongData) -> None: ...
+
+    def record_hit(self, key: str) -> None:
+        """
+        Counts a hit for the key, which may have been served from memory.
+        Backends may buffer the counts, so this must not block.
+        """
+        ...
+
+    async def close(self) -> None: ...
+
+
+class LookupCache:
+    """
+    Caches song data by lookup key in memory and, optionally, in a second
+    (usually slower, but persistent) backend.
+
+    Song data is also stored under the keys of all of its platform links, so a
+    song is only looked up once, no matter which platform link is posted.
+
+    Keys that could not be resolved are remembered separately, together with the
+    reason, to avoid repeating lookups that are known to fail.
+    """
+
+    def __init__(
+        self,
+        memory: LruCache[str, SongData],
+        unresolvable: LruCache[str, UnresolvableReason],
+        backend: CacheBackend | None = None,
+    ):
+        self._memory = memory
+        self._unresolvable = unresolvable
+        self._backend = backend
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._memory.stats
+
+    @property
+    def unresolvable_stats(self) -> CacheStats:
+        return self._unresolvable.stats
+
+    async def open(self) -> None:
+        """
+        Opens the backend. If that fails, the cache continues in memory only.
+        """
+        backend = self._backend
+        if backend is None:
+            return
+
+        try:
+            await backend.open()
+        except CacheException as e:
+            _LOG.error("Could not open cache backend, using memory only", exc_info=e)
+            self._backend = None
+            try:
+                await backend.close()
+            except CacheException as close_error:
+                _LOG.debug("Could not close cache backend", exc_info=close_error)
+
+    async def close(self) -> None:
+        if backend := self._backend:
+            await backend.close()
+
+    async def get(self, key: str) -> SongData | None:
+        backend = self._backend
+        data = self._memory.get(key)
+        if data is not None:
+            if backend is not None:
+                backend.record_hit(key)
+            return data
+
+        if backend is None:
+            return None
+
+        try:
+            data = await backend.get(key)
+        except CacheException as e:
+            _LOG.error("Could not read from cache backend", exc_info=e)
+            return None
+
+        if data is not None:
+            backend.record_hit(key)
+            self._memory.put(key, data)
+
+        return data
+
+    async def put(self, key: str, data: SongData) -> None:
+        keys = {key}
+        keys.update(cache_key(link) for _, link in data.links.items())
+
+        for k in keys:
+            self._memory.put(k, data)
+
+        if backend := self._backend:
+            try:
+                await backend.put(keys, data)
+            except CacheException as e:
+                _LOG.error("Could not write to cache backend", exc_info=e)
+
+    def preload(
+        self,
+        keys: Collection[str],
+        data: SongData,
+        *,
+        ttl: float | None = None,
+    ) -> None:
+        """
+        Puts song data into memory only, e.g. because it was read from the
+        backend or a snapshot anyway. The TTL should be the remaining lifetime
+        of the source entry.
+        """
+        for key in keys:
+            self._memory.put(key, data, ttl=ttl)
+
+    def get_unresolvable(self, key: str) -> UnresolvableReason | None:
+        return self._unresolvable.get(key)
+
+    def put_unresolvable(self, key: str, reason: UnresolvableReason) -> None:
+        self._unresolvable.put(key, reason)
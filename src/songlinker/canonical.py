@@ -0,0 +1,248 @@
+import re
+from typing import TYPE_CHECKING, NamedTuple
+from urllib import parse
+
+from songlinker.link_api import Platform
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class CanonicalKey(NamedTuple):
+    platform: Platform
+    type: str
+    id: str
+
+    def __str__(self) -> str:
+        return f"{self.platform.value.id}:{self.type}:{self.id}"
+
+
+type _Parser = Callable[[parse.SplitResult, list[str]], CanonicalKey | None]
+
+_SPOTIFY_TYPES = {"track", "album", "artist", "playlist", "episode", "show"}
+_SPOTIFY_LOCALE = re.compile(r"intl-[a-z]{2}(-[a-z]{2})?", re.IGNORECASE)
+_APPLE_LOCALE = re.compile(r"[a-z]{2}", re.IGNORECASE)
+_DEEZER_TYPES = {"track", "album", "artist", "playlist", "episode", "show"}
+_TIDAL_TYPES = {"track", "album", "artist", "playlist", "video", "mix"}
+
+
+def _parse_spotify(url: parse.SplitResult, path: list[str]) -> CanonicalKey | None:
+    if path and _SPOTIFY_LOCALE.fullmatch(path[0]):
+        path = path[1:]
+
+    if len(path) >= 2 and path[0] in _SPOTIFY_TYPES:
+        return CanonicalKey(Platform.spotify, path[0], path[1])
+
+    return None
+
+
+def _parse_spotify_uri(url: str) -> CanonicalKey | None:
+    parts = url.split(":")
+    if len(parts) == 3 and parts[1] in _SPOTIFY_TYPES and parts[2]:
+        return CanonicalKey(Platform.spotify, parts[1], parts[2])
+
+    return None
+
+
+def _parse_youtube(url: parse.SplitResult, path: list[str]) -> CanonicalKey | None:
+    query = parse.parse_qs(url.query)
+    if not path:
+        return None
+
+    match path[0]:
+        case "watch":
+            if video_ids := query.get("v"):
+                return CanonicalKey(Platform.youtube, "video", video_ids[0])
+        case "shorts" | "embed" | "live" | "v" if len(path) >= 2:
+            return CanonicalKey(Platform.youtube, "video", path[1])
+        case "playlist":
+            if list_ids := query.get("list"):
+                return CanonicalKey(Platform.youtube, "playlist", list_ids[0])
+        case "browse" if len(path) >= 2:
+            return CanonicalKey(Platform.youtube, "browse", path[1])
+
+    return None
+
+
+def _parse_youtube_short(
+    url: parse.SplitResult,
+    path: list[str],
+) -> CanonicalKey | None:
+    if len(path) == 1:
+        return CanonicalKey(Platform.youtube, "video", path[0])
+
+    return None
+
+
+def _parse_apple_music(
+    url: parse.SplitResult,
+    path: list[str],
+) -> CanonicalKey | None:
+    if path and _APPLE_LOCALE.fullmatch(path[0]):
+        path = path[1:]
+
+    if len(path) < 2:
+        return None
+
+    entity_type = path[0]
+    entity_id = path[-1].removeprefix("id")
+    if entity_type == "album":
+        if track_ids := parse.parse_qs(url.query).get("i"):
+            return CanonicalKey(Platform.apple_music, "song", track_ids[0])
+
+    if entity_type in {"album", "song", "artist", "playlist", "music-video"}:
+        return CanonicalKey(Platform.apple_music, entity_type, entity_id)
+
+    return None
+
+
+def _parse_deezer(url: parse.SplitResult, path: list[str]) -> CanonicalKey | None:
+    if path and path[0] not in _DEEZER_TYPES:
+        # Locale, e.g. /en/track/...
+        path = path[1:]
+
+    if len(path) >= 2 and path[0] in _DEEZER_TYPES:
+        return CanonicalKey(Platform.deezer, path[0], path[1])
+
+    return None
+
+
+def _parse_tidal(url: parse.SplitResult, path: list[str]) -> CanonicalKey | None:
+    if path and path[0] == "browse":
+        path = path[1:]
+
+    if len(path) >= 2 and path[0] in _TIDAL_TYPES:
+        return CanonicalKey(Platform.tidal, path[0], path[1])
+
+    return None
+
+
+def _parse_soundcloud(
+    url: parse.SplitResult,
+    path: list[str],
+) -> CanonicalKey | None:
+    path = [segment.lower() for segment in path]
+    match path:
+        case [user, "sets", playlist, *_]:
+            return CanonicalKey(Platform.soundcloud, "playlist", f"{user}/{playlist}")
+        case [user, track] if track not in {"tracks", "albums", "sets"}:
+            return CanonicalKey(Platform.soundcloud, "track", f"{user}/{track}")
+
+    return None
+
+
+def _parse_amazon_music(
+    url: parse.SplitResult,
+    path: list[str],
+) -> CanonicalKey | None:
+    if len(path) < 2:
+        return None
+
+    query = parse.parse_qs(url.query)
+    match path[0]:
+        case "albums":
+            if track_ids := query.get("trackAsin"):
+                return CanonicalKey(Platform.amazon_music, "track", track_ids[0])
+            return CanonicalKey(Platform.amazon_music, "album", path[1])
+        case "tracks":
+            return CanonicalKey(Platform.amazon_music, "track", path[1])
+        case "artists" | "playlists" | "user-playlists":
+            return CanonicalKey(Platform.amazon_music, path[0][:-1], path[1])
+
+    return None
+
+
+_AMAZON_MUSIC_TLDS = (
+    "com",
+    "de",
+    "co.uk",
+    "fr",
+    "it",
+    "es",
+    "co.jp",
+    "ca",
+    "com.au",
+    "com.br",
+    "com.mx",
+    "in",
+)
+
+PARSER_BY_HOST: dict[str, _Parser] = {
+    "open.spotify.com": _parse_spotify,
+    "play.spotify.com": _parse_spotify,
+    "youtube.com": _parse_youtube,
+    "m.youtube.com": _parse_youtube,
+    "music.youtube.com": _parse_youtube,
+    "youtu.be": _parse_youtube_short,
+    "music.apple.com": _parse_apple_music,
+    "itunes.apple.com": _parse_apple_music,
+    "geo.music.apple.com": _parse_apple_music,
+    "deezer.com": _parse_deezer,
+    "tidal.com": _parse_tidal,
+    "listen.tidal.com": _parse_tidal,
+    "soundcloud.com": _parse_soundcloud,
+    "m.soundcloud.com": _parse_soundcloud,
+    **{f"music.amazon.{tld}": _parse_amazon_music for tld in _AMAZON_MUSIC_TLDS},
+}
+
+
+def _normalize_host(host: str) -> str:
+    return host.lower().removeprefix("www.")
+
+
+def split_url(url: str) -> parse.SplitResult | None:
+    """
+    Splits a URL into its components, assuming HTTPS if it has no scheme (as
+    Telegram also detects URLs like "open.spotify.com/track/...").
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+
+    try:
+        split = parse.urlsplit(url)
+        # Accessing the hostname and port validates them
+        _ = split.hostname, split.port
+    except ValueError:
+        return None
+
+    return split
+
+
+def canonicalize(url: str) -> CanonicalKey | None:
+    """
+    Reduces a URL to a stable key identifying the entity on its platform.
+
+    Tracking parameters and locale segments are ignored. Returns None for
+    unknown URLs and URLs that can't be resolved without a network request
+    (e.g. short links).
+    """
+    url = url.strip()
+    if url.startswith("spotify:"):
+        return _parse_spotify_uri(url)
+
+    split = split_url(url)
+    if split is None:
+        return None
+
+    host = split.hostname
+    if not host:
+        return None
+
+    parser = PARSER_BY_HOST.get(_normalize_host(host))
+    if parser is None:
+        return None
+
+    path = [segment for segment in split.path.split("/") if segment]
+    return parser(split, path)
+
+
+def cache_key(url: str) -> str:
+    """
+    Returns a key to cache or deduplicate lookups for the given URL by.
+    """
+    key = canonicalize(url)
+    if key is None:
+        return url.strip()
+
+    return str(key)
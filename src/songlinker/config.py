@@ -1,10 +1,66 @@
+import logging
 from dataclasses import dataclass
+from pathlib import Path
 from typing import TYPE_CHECKING, Self
 
-from bs_nats_updater import NatsConfig
+from songlinker.http_client import DEFAULT_HTTP_CONFIG, HttpClientConfig
+from songlinker.logs import parse_log_levels
+from songlinker.sampling import TraceSampling
 
 if TYPE_CHECKING:
     from bs_config import Env
+    from bs_nats_updater import NatsConfig
+
+
+def _to_path(value: str | None) -> Path | None:
+    if not value:
+        return None
+
+    return Path(value)
+
+
+@dataclass(frozen=True, kw_only=True)
+class NatsCacheConfig:
+    url: str
+    credentials_file: Path | None
+    bucket: str
+    replicas: int
+    ttl_seconds: int
+    timeout_seconds: float
+
+    @classmethod
+    def from_env(cls, env: Env) -> Self | None:
+        url = env.get_string("url")
+        if not url:
+            return None
+
+        credentials_file = env.get_string("credentials-file")
+        return cls(
+            url=url,
+            credentials_file=Path(credentials_file) if credentials_file else None,
+            bucket=env.get_string("bucket", default="songlinker-cache"),
+            replicas=env.get_int("replicas", default=1),
+            ttl_seconds=env.get_int("ttl-seconds", default=7 * 24 * 60 * 60),
+            timeout_seconds=env.get_int("timeout-ms", default=500) / 1000,
+        )
+
+
+_DEFAULT_TELEGRAM_HTTP_CONFIG = HttpClientConfig(
+    max_connections=32,
+    max_keepalive_connections=16,
+    keepalive_expiry_seconds=60,
+    http2=False,
+    connect_timeout_seconds=5,
+    read_timeout_seconds=5,
+    write_timeout_seconds=5,
+    pool_timeout_seconds=1,
+    prewarm_connections=2,
+)
+
+_DEFAULT_LOG_LEVELS = {
+    "": logging.WARNING,
+    "songlinker": logging.DEBUG,
+}
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -12,17 +68,160 @@ class Config:
     app_version: str
     nats: NatsConfig
     telegram_api_key: str
+    telegram_http: HttpClientConfig
     songlinker_api_key: str
+    songlink_http: HttpClientConfig
     sentry_dsn: str | None
     enable_telemetry: bool
+    trace_sampling: TraceSampling
+    trace_sample_percent: int
+    trace_slow_threshold_ms: int
+    metrics_port: int | None
+    log_levels: dict[str, int]
+    log_queue_size: int
+    songlink_requests_per_second: int
+    songlink_burst: int
+    songlink_max_concurrency: int
+    songlink_latency_threshold_seconds: int
+    songlink_max_attempts: int
+    songlink_strict_parsing: bool
+    songlink_circuit_failure_threshold: int
+    songlink_circuit_reset_timeout_seconds: int
+    message_concurrency: int
+    message_queue_size_per_chat: int
+    message_max_age_seconds: int
+    message_lookup_concurrency: int
+    message_lookup_timeout_seconds: int
+    inline_query_concurrency: int
+    inline_query_timeout_seconds: int
+    inline_cache_time_seconds: int
+    unknown_host_sample_percent: int
+    cache_max_size: int
+    cache_ttl_seconds: int
+    negative_cache_max_size: int
+    negative_cache_ttl_seconds: int
+    persistent_cache_path: Path | None
+    persistent_cache_ttl_seconds: int
+    persistent_cache_compaction_interval_seconds: int
+    cache_preload_path: Path | None
+    cache_preload_entries: int
+    shared_cache: NatsCacheConfig | None
 
     @classmethod
     def from_env(cls, env: Env) -> Self:
+        # Imports NATS, pydantic and Telegram, which only the bot needs
+        from bs_nats_updater import NatsConfig
+
         return cls(
             app_version=env.get_string("app-version", default="dirty"),
             nats=NatsConfig.from_env(env / "nats"),
             telegram_api_key=env.get_string("telegram-token", required=True),
+            telegram_http=HttpClientConfig.from_env(
+                env / "telegram-http",
+                default=_DEFAULT_TELEGRAM_HTTP_CONFIG,
+            ),
             songlinker_api_key=env.get_string("songlink-api-token", required=True),
+            songlink_http=HttpClientConfig.from_env(
+                env / "songlink-http",
+                default=DEFAULT_HTTP_CONFIG,
+            ),
             sentry_dsn=env.get_string("sentry-dsn"),
             enable_telemetry=env.get_bool("enable-telemetry", default=False),
+            trace_sampling=TraceSampling(
+                env.get_string("trace-sampling", default=TraceSampling.always.value)
+            ),
+            trace_sample_percent=env.get_int("trace-sample-percent", default=100),
+            trace_slow_threshold_ms=env.get_int(
+                "trace-slow-threshold-ms",
+                default=2000,
+            ),
+            metrics_port=env.get_int("metrics-port"),
+            log_levels={
+                **_DEFAULT_LOG_LEVELS,
+                **parse_log_levels(env.get_string("log-levels")),
+            },
+            log_queue_size=env.get_int("log-queue-size", default=10_000),
+            songlink_requests_per_second=env.get_int(
+                "songlink-requests-per-second",
+                default=5,
+            ),
+            songlink_burst=env.get_int("songlink-burst", default=10),
+            songlink_max_concurrency=env.get_int(
+                "songlink-max-concurrency",
+                default=16,
+            ),
+            songlink_latency_threshold_seconds=env.get_int(
+                "songlink-latency-threshold-seconds",
+                default=5,
+            ),
+            songlink_max_attempts=env.get_int("songlink-max-attempts", default=3),
+            songlink_strict_parsing=env.get_bool(
+                "songlink-strict-parsing",
+                default=False,
+            ),
+            songlink_circuit_failure_threshold=env.get_int(
+                "songlink-circuit-failure-threshold",
+                default=5,
+            ),
+            songlink_circuit_reset_timeout_seconds=env.get_int(
+                "songlink-circuit-reset-timeout-seconds",
+                default=30,
+            ),
+            message_concurrency=env.get_int("message-concurrency", default=16),
+            message_queue_size_per_chat=env.get_int(
+                "message-queue-size-per-chat",
+                default=32,
+            ),
+            message_max_age_seconds=env.get_int(
+                "message-max-age-seconds",
+                default=5 * 60,
+            ),
+            message_lookup_concurrency=env.get_int(
+                "message-lookup-concurrency",
+                default=4,
+            ),
+            message_lookup_timeout_seconds=env.get_int(
+                "message-lookup-timeout-seconds",
+                default=30,
+            ),
+            inline_query_concurrency=env.get_int(
+                "inline-query-concurrency",
+                default=32,
+            ),
+            inline_query_timeout_seconds=env.get_int(
+                "inline-query-timeout-seconds",
+                default=8,
+            ),
+            inline_cache_time_seconds=env.get_int(
+                "inline-cache-time-seconds",
+                default=60 * 60,
+            ),
+            unknown_host_sample_percent=env.get_int(
+                "unknown-host-sample-percent",
+                default=0,
+            ),
+            cache_max_size=env.get_int("cache-max-size", default=4096),
+            cache_ttl_seconds=env.get_int("cache-ttl-seconds", default=24 * 60 * 60),
+            negative_cache_max_size=env.get_int(
+                "negative-cache-max-size",
+                default=16384,
+            ),
+            negative_cache_ttl_seconds=env.get_int(
+                "negative-cache-ttl-seconds",
+                default=60 * 60,
+            ),
+            persistent_cache_path=_to_path(env.get_string("persistent-cache-path")),
+            persistent_cache_ttl_seconds=env.get_int(
+                "persistent-cache-ttl-seconds",
+                default=7 * 24 * 60 * 60,
+            ),
+            persistent_cache_compaction_interval_seconds=env.get_int(
+                "persistent-cache-compaction-interval-seconds",
+                default=60 * 60,
+            ),
+            cache_preload_path=_to_path(env.get_string("cache-preload-path")),
+            # Songs have several keys each, so the preload may also be limited
+            # by cache-max-size
+            cache_preload_entries=env.get_int("cache-preload-entries", default=1000),
+            shared_cache=NatsCacheConfig.from_env(env / "shared-cache"),
         )
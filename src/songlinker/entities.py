@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from telegram import MessageEntity
+
+
+class EntityPosition(NamedTuple):
+    offset: int
+    length: int
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+
+@dataclass(frozen=True)
+class EntityMatch:
+    position: EntityPosition
+    url: str | None = None
+    is_spoiler: bool = False
+
+    def require_url(self) -> str:
+        url = self.url
+        if not url:
+            raise ValueError("url is None")
+
+        return url
+
+
+def extract_url_matches(
+    text: str,
+    entities: Iterable[MessageEntity],
+) -> list[EntityMatch]:
+    """
+    Extracts the URLs of a message in order of their position.
+
+    A URL is marked as a spoiler if it is within a spoiler entity. Repeated
+    URLs are only returned once, at their first position, and are marked as a
+    spoiler if any of their occurrences is.
+    """
+    # Entity offsets and lengths are in UTF-16 code units
+    encoded = text.encode("utf-16-le")
+    urls: list[tuple[EntityPosition, str]] = []
+    spoilers: list[EntityPosition] = []
+    for entity in entities:
+        position = EntityPosition(offset=entity.offset, length=entity.length)
+        match entity.type:
+            case "url":
+                url = encoded[position.offset * 2 : position.end * 2].decode(
+                    "utf-16-le"
+                )
+                urls.append((position, url))
+            case "text_link" if entity.url:
+                urls.append((position, entity.url))
+            case "spoiler":
+                spoilers.append(position)
+
+    urls.sort(key=lambda position_url: position_url[0].offset)
+    spoilers.sort()
+
+    # Sweep over the URLs by offset, keeping track of the furthest end of all
+    # spoilers that start at or before the current URL. The URL is within one
+    # of them if and only if that end is at or after the end of the URL.
+    spoiler_index = 0
+    spoiler_end = -1
+    match_by_url: dict[str, EntityMatch] = {}
+    for position, url in urls:
+        while (
+            spoiler_index < len(spoilers)
+            and spoilers[spoiler_index].offset <= position.offset
+        ):
+            spoiler_end = max(spoiler_end, spoilers[spoiler_index].end)
+            spoiler_index += 1
+
+        if "song.link" in url:
+            continue
+
+        is_spoiler = spoiler_end >= position.end
+        existing = match_by_url.get(url)
+        if existing is None:
+            match_by_url[url] = EntityMatch(
+                position=position,
+                url=url,
+                is_spoiler=is_spoiler,
+            )
+        elif is_spoiler and not existing.is_spoiler:
+            match_by_url[url] = EntityMatch(
+                position=existing.position,
+                url=url,
+                is_spoiler=True,
+            )
+
+    return list(match_by_url.values())
@@ -0,0 +1,110 @@
+import logging
+import random
+from typing import TYPE_CHECKING, Any
+
+from songlinker.canonical import PARSER_BY_HOST, split_url
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+_LOG = logging.getLogger(__name__)
+
+# Hosts of short links and platforms that song.link supports, but that we don't
+# know the URL structure of.
+_OTHER_MUSIC_HOSTS = (
+    "spotify.link",
+    "spotify.app.link",
+    "on.soundcloud.com",
+    "deezer.page.link",
+    "link.deezer.com",
+    "dzr.page.link",
+    "tidal.link",
+    "amzn.to",
+    "music.yandex.com",
+    "music.yandex.ru",
+    "pandora.com",
+    "pandora.app.link",
+    "napster.com",
+    "audiomack.com",
+    "anghami.com",
+    "play.anghami.com",
+    "boomplay.com",
+    "audius.co",
+)
+
+_TERMINAL = ""
+
+
+class HostMatcher:
+    """
+    Matches hostnames against a set of domains, including their subdomains.
+
+    The domains are stored in a trie of their labels in reverse order, so a
+    lookup only touches as many nodes as the hostname has labels.
+    """
+
+    def __init__(self, domains: Iterable[str]):
+        self._root: dict[str, Any] = {}
+        for domain in domains:
+            node = self._root
+            for label in reversed(domain.lower().split(".")):
+                node = node.setdefault(label, {})
+            node[_TERMINAL] = True
+
+    def matches(self, host: str) -> bool:
+        node = self._root
+        for label in reversed(host.lower().rstrip(".").split(".")):
+            next_node = node.get(label)
+            if next_node is None:
+                return False
+
+            if _TERMINAL in next_node:
+                return True
+
+            node = next_node
+
+        return False
+
+
+MUSIC_HOSTS = HostMatcher(
+    [
+        *PARSER_BY_HOST.keys(),
+        *_OTHER_MUSIC_HOSTS,
+    ]
+)
+
+
+def is_music_url(url: str) -> bool:
+    split = split_url(url)
+    if split is None or not split.hostname:
+        return False
+
+    return MUSIC_HOSTS.matches(split.hostname)
+
+
+class HostClassifier:
+    """
+    Decides whether a URL is worth looking up.
+
+    URLs of unknown hosts are skipped, except for a sampled fraction that is
+    still looked up to discover new platforms.
+    """
+
+    def __init__(
+        self,
+        *,
+        unknown_host_sample_rate: float,
+        random_func: Callable[[], float] = random.random,
+    ):
+        self._sample_rate = unknown_host_sample_rate
+        self._random = random_func
+
+    def should_look_up(self, url: str) -> bool:
+        if is_music_url(url):
+            return True
+
+        if self._sample_rate > 0 and self._random() < self._sample_rate:
+            _LOG.debug("Probing URL with unknown host")
+            return True
+
+        return False
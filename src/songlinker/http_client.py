@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Self
+
+import httpx
+
+if TYPE_CHECKING:
+    from bs_config import Env
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HttpClientConfig:
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry_seconds: int
+    http2: bool
+    connect_timeout_seconds: int
+    read_timeout_seconds: int
+    write_timeout_seconds: int
+    pool_timeout_seconds: int
+    prewarm_connections: int
+
+    @classmethod
+    def from_env(cls, env: Env, *, default: Self) -> Self:
+        return cls(
+            max_connections=env.get_int(
+                "max-connections",
+                default=default.max_connections,
+            ),
+            max_keepalive_connections=env.get_int(
+                "max-keepalive-connections",
+                default=default.max_keepalive_connections,
+            ),
+            keepalive_expiry_seconds=env.get_int(
+                "keepalive-expiry-seconds",
+                default=default.keepalive_expiry_seconds,
+            ),
+            http2=env.get_bool("http2", default=default.http2),
+            connect_timeout_seconds=env.get_int(
+                "connect-timeout-seconds",
+                default=default.connect_timeout_seconds,
+            ),
+            read_timeout_seconds=env.get_int(
+                "read-timeout-seconds",
+                default=default.read_timeout_seconds,
+            ),
+            write_timeout_seconds=env.get_int(
+                "write-timeout-seconds",
+                default=default.write_timeout_seconds,
+            ),
+            pool_timeout_seconds=env.get_int(
+                "pool-timeout-seconds",
+                default=default.pool_timeout_seconds,
+            ),
+            prewarm_connections=env.get_int(
+                "prewarm-connections",
+                default=default.prewarm_connections,
+            ),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry_seconds,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout_seconds,
+            read=self.read_timeout_seconds,
+            write=self.write_timeout_seconds,
+            pool=self.pool_timeout_seconds,
+        )
+
+    def create_client(
+        self,
+        *,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=self.limits(),
+            timeout=self.timeout(),
+            http2=self.http2,
+            transport=transport,
+        )
+
+
+# Defaults for the song.link client, whose lookups can take a while
+DEFAULT_HTTP_CONFIG = HttpClientConfig(
+    max_connections=32,
+    max_keepalive_connections=16,
+    keepalive_expiry_seconds=60,
+    # Lets concurrent lookups share a connection
+    http2=True,
+    connect_timeout_seconds=5,
+    read_timeout_seconds=20,
+    write_timeout_seconds=5,
+    pool_timeout_seconds=5,
+    prewarm_connections=2,
+)
+
+
+async def prewarm(client: httpx.AsyncClient, url: str, *, connections: int) -> None:
+    """
+    Resolves the host and establishes pooled connections to it up front, so the
+    first real requests don't pay for DNS lookups and TLS handshakes.
+    """
+    if connections <= 0:
+        return
+
+    # Concurrent requests each open a connection (with HTTP/2, they may share one)
+    results = await asyncio.gather(
+        *(client.head(url) for _ in range(connections)),
+        return_exceptions=True,
+    )
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        _LOG.warning(
+            "Could not pre-warm %d of %d connections to %s",
+            len(failures),
+            connections,
+            url,
+            exc_info=failures[0],
+        )
+    else:
+        _LOG.debug("Pre-warmed %d connections to %s", connections, url)
@@ -1,17 +1,47 @@
+import asyncio
+import logging
+import time
 from dataclasses import dataclass
 from enum import Enum
 from typing import TYPE_CHECKING, Annotated, NamedTuple
 
 import httpx
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.metrics import CallbackOptions, Observation
 from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from pydantic.alias_generators import to_camel
 
+from songlinker.http_client import DEFAULT_HTTP_CONFIG, prewarm
+from songlinker.metrics import DURATION_BUCKETS
+from songlinker.rate_limit import Priority, RateLimiter, parse_retry_after
+from songlinker.resilience import (
+    CircuitBreaker,
+    CircuitOpenException,
+    RetryPolicy,
+)
+from songlinker.single_flight import SingleFlight
+
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Callable, Iterable, Sequence
+
+    from songlinker.http_client import HttpClientConfig
+    from songlinker.workers import WorkerPool
 
+_LOG = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
+
+_lookup_duration = meter.create_histogram(
+    "songlinker.link_api.lookup.duration",
+    unit="s",
+    description="Duration of song.link lookups (including retries) by outcome",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+_responses = meter.create_counter(
+    "songlinker.link_api.responses",
+    description="song.link responses by status code",
+)
 
 
 class CamelCaseModel(BaseModel):
@@ -31,6 +61,11 @@ UniqueEntityId = Annotated[
 NonEmptyString = Annotated[str, Field(min_length=1)]
 
 
+class DeferredCamelCaseModel(CamelCaseModel):
+    # Only used with strict parsing, so the validators are built on demand
+    model_config = ConfigDict(defer_build=True)
+
+
 class PlatformSpec(NamedTuple):
     id: str
     name: str
@@ -46,7 +81,14 @@ class Platform(Enum):
     youtube = PlatformSpec("youtube", "YouTube")
 
 
-class PlatformMetadata(CamelCaseModel):
+class UnresolvableReason(Enum):
+    # song.link doesn't know the entity (e.g. because it isn't music)
+    unknown_entity = "could_not_resolve_entity"
+    # The entity is only available on a single platform
+    single_platform = "single_platform"
+
+
+class PlatformMetadata(DeferredCamelCaseModel):
     type: str
     title: str
     artist_name: str
@@ -59,14 +101,14 @@ class PlatformMetadata(CamelCaseModel):
     platforms: Annotated[list[str], Field(min_length=1)]
 
 
-class PlatformLink(CamelCaseModel):
+class PlatformLink(DeferredCamelCaseModel):
     entity_unique_id: UniqueEntityId
     url: HttpUrl
     native_app_uri_desktop: str | None = None
     native_app_uri_mobile: str | None = None
 
 
-class LinkResponse(CamelCaseModel):
+class LinkResponse(DeferredCamelCaseModel):
     page_url: HttpUrl
     entities_by_unique_id: Annotated[
         dict[UniqueEntityId, PlatformMetadata], Field(min_length=1)
@@ -74,6 +116,47 @@ class LinkResponse(CamelCaseModel):
     links_by_platform: Annotated[dict[str, PlatformLink], Field(min_length=1)]
 
 
+class LeanPlatformLink(CamelCaseModel):
+    entity_unique_id: str
+    url: str
+
+
+class LeanLinksByPlatform(CamelCaseModel):
+    # Only the platforms we show, named like the Platform members
+    spotify: LeanPlatformLink | None = None
+    amazon_music: LeanPlatformLink | None = None
+    apple_music: LeanPlatformLink | None = None
+    deezer: LeanPlatformLink | None = None
+    soundcloud: LeanPlatformLink | None = None
+    tidal: LeanPlatformLink | None = None
+    youtube: LeanPlatformLink | None = None
+
+
+class LeanPlatformMetadata(CamelCaseModel):
+    type: str
+    title: str
+    artist_name: str
+
+    thumbnail_url: str | None = None
+    thumbnail_width: float | int | None = None
+    thumbnail_height: float | int | None = None
+
+
+class LeanLinkResponse(CamelCaseModel):
+    """
+    The subset of LinkResponse we actually use.
+
+    Other fields of the response are skipped during parsing instead of being
+    validated and converted to Python objects.
+    """
+
+    page_url: str
+    entities_by_unique_id: Annotated[
+        dict[str, LeanPlatformMetadata], Field(min_length=1)
+    ]
+    links_by_platform: LeanLinksByPlatform
+
+
 class ErrorResponse(CamelCaseModel):
     code: NonEmptyString
 
@@ -146,33 +229,109 @@ class IoException(Exception):
     pass
 
 
+class TransientIoException(IoException):
+    """
+    A failure that may go away if the request is retried.
+    """
+
+
+class RateLimitedException(IoException):
+    def __init__(self, retry_after: float | None):
+        super().__init__(f"Rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class UnavailableException(IoException):
+    """
+    Raised without sending a request while the API is considered to be down.
+    """
+
+
+_PREFERRED_METADATA_PLATFORMS = (
+    Platform.spotify,
+    Platform.tidal,
+    Platform.apple_music,
+    Platform.soundcloud,
+    Platform.amazon_music,
+    Platform.youtube,
+)
+
+DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=0.2, max_delay=2)
+
+
 class LinkApi:
-    BASE_URL = "https://api.song.link/v1-alpha.1/links"
+    ORIGIN = "https://api.song.link"
+    BASE_URL = f"{ORIGIN}/v1-alpha.1/links"
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        circuit_breaker: CircuitBreaker | None = None,
+        strict_parsing: bool = False,
+        http_config: HttpClientConfig = DEFAULT_HTTP_CONFIG,
+        transport: httpx.AsyncBaseTransport | None = None,
+        worker_pool: WorkerPool | None = None,
+    ):
         self._api_key = api_key
-        self._client = httpx.AsyncClient(timeout=20)
+        self._strict_parsing = strict_parsing
+        if strict_parsing:
+            # Build the validators now instead of during the first lookup
+            LinkResponse.model_rebuild()
+        self._worker_pool = worker_pool
+        self._rate_limiter = rate_limiter or RateLimiter.unlimited()
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker or CircuitBreaker(
+            failure_threshold=5,
+            reset_timeout=30,
+        )
+        self._http_config = http_config
+        self._client = http_config.create_client(transport=transport)
         HTTPXClientInstrumentor().instrument_client(self._client)
+        self._in_flight: SingleFlight[str, SongData | UnresolvableReason] = (
+            SingleFlight()
+        )
+
+    def _observe_circuit_state(
+        self,
+        options: CallbackOptions,
+    ) -> Iterable[Observation]:
+        yield Observation(self._circuit_breaker.state.value)
+
+    def _observe_in_flight(self, options: CallbackOptions) -> Iterable[Observation]:
+        yield Observation(self._rate_limiter.in_flight)
+
+    def _observe_waiting(self, options: CallbackOptions) -> Iterable[Observation]:
+        yield Observation(self._rate_limiter.waiting)
+
+    def _observe_concurrency_limit(
+        self,
+        options: CallbackOptions,
+    ) -> Iterable[Observation]:
+        yield Observation(self._rate_limiter.concurrency_limit)
+
+    async def prewarm(self) -> None:
+        await prewarm(
+            self._client,
+            self.ORIGIN,
+            connections=self._http_config.prewarm_connections,
+        )
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    @classmethod
     def _extract_metadata(
-        self,
+        cls,
         links_by_platform: dict[str, PlatformLink],
         entities_by_unique_id: dict[str, PlatformMetadata],
     ) -> SongMetadata:
         entity: PlatformMetadata
-        for platform in (
-            "spotify",
-            "tidal",
-            "appleMusic",
-            "soundcloud",
-            "amazonMusic",
-            "youtube",
-        ):
+        for platform in _PREFERRED_METADATA_PLATFORMS:
             # first try our preferred providers
-            link = links_by_platform.get(platform)
+            link = links_by_platform.get(platform.value.id)
             if link is None:
                 continue
 
@@ -183,12 +342,39 @@ class LinkApi:
             # If no preferred provider was found, use the first one
             _, entity = entities_by_unique_id.popitem()
 
+        return cls._build_metadata(entity)
+
+    @classmethod
+    def _extract_lean_metadata(
+        cls,
+        links_by_platform: LeanLinksByPlatform,
+        entities_by_unique_id: dict[str, LeanPlatformMetadata],
+    ) -> SongMetadata:
+        entity: LeanPlatformMetadata
+        for platform in _PREFERRED_METADATA_PLATFORMS:
+            link: LeanPlatformLink | None = getattr(links_by_platform, platform.name)
+            if link is None:
+                continue
+
+            entity_id = link.entity_unique_id
+            entity = entities_by_unique_id[entity_id]
+            break
+        else:
+            _, entity = entities_by_unique_id.popitem()
+
+        return cls._build_metadata(entity)
+
+    @classmethod
+    def _build_metadata(
+        cls,
+        entity: PlatformMetadata | LeanPlatformMetadata,
+    ) -> SongMetadata:
         thumbnail_url = entity.thumbnail_url
         if thumbnail_url:
             thumbnail = ThumbnailMetadata(
                 url=thumbnail_url,
-                width=self._number_to_int(entity.thumbnail_width),
-                height=self._number_to_int(entity.thumbnail_height),
+                width=cls._number_to_int(entity.thumbnail_width),
+                height=cls._number_to_int(entity.thumbnail_height),
             )
         else:
             thumbnail = None
@@ -217,17 +403,39 @@ class LinkApi:
             return None
         return platform_link.url
 
+    @classmethod
+    def parse_response(cls, content: bytes, *, strict: bool) -> SongData | None:
+        """
+        Parses a successful response. Returns None if the song is only
+        available on a single platform.
+        """
+        if strict:
+            return cls._parse_response_strict(content)
+
+        return cls._parse_response_lean(content)
+
     def _parse_response(self, content: bytes) -> SongData | None:
+        return self.parse_response(content, strict=self._strict_parsing)
+
+    async def _parse_response_async(self, content: bytes) -> SongData | None:
+        worker_pool = self._worker_pool
+        if worker_pool is None:
+            return self._parse_response(content)
+
+        return await worker_pool.parse_response(content, strict=self._strict_parsing)
+
+    @classmethod
+    def _parse_response_strict(cls, content: bytes) -> SongData | None:
         response = LinkResponse.model_validate_json(content)
 
-        metadata = self._extract_metadata(
+        metadata = cls._extract_metadata(
             links_by_platform=response.links_by_platform,
             entities_by_unique_id=response.entities_by_unique_id,
         )
 
         link_by_platform: dict[Platform, str] = {}
         for platform in Platform:
-            link = self._extract_url(response.links_by_platform, platform)
+            link = cls._extract_url(response.links_by_platform, platform)
             if link is not None:
                 link_by_platform[platform] = str(link)
 
@@ -244,29 +452,226 @@ class LinkApi:
             links=links,
         )
 
-    @tracer.start_as_current_span("lookup_links")
+    @classmethod
+    def _parse_response_lean(cls, content: bytes) -> SongData | None:
+        response = LeanLinkResponse.model_validate_json(content)
+        links_by_platform = response.links_by_platform
+
+        link_by_platform: dict[Platform, str] = {}
+        for platform in Platform:
+            link: LeanPlatformLink | None = getattr(links_by_platform, platform.name)
+            if link is not None:
+                link_by_platform[platform] = link.url
+
+        if len(link_by_platform) <= 1:
+            return None
+
+        metadata = cls._extract_lean_metadata(
+            links_by_platform=links_by_platform,
+            entities_by_unique_id=response.entities_by_unique_id,
+        )
+
+        return SongData(
+            metadata=metadata,
+            links=SongLinks(
+                page=response.page_url,
+                link_by_platform=link_by_platform,
+            ),
+        )
+
     async def lookup_links(self, url: str) -> SongData | None:
+        result = await self.resolve(url)
+        if isinstance(result, UnresolvableReason):
+            return None
+
+        return result
+
+    async def resolve(
+        self,
+        url: str,
+        *,
+        key: str | None = None,
+        priority: Priority = Priority.background,
+    ) -> SongData | UnresolvableReason:
+        """
+        Like lookup_links, but tells the caller why no song data was found.
+
+        Concurrent calls with the same key (defaulting to the URL) share a single
+        request.
+        """
+        return await self._in_flight.run(
+            key or url,
+            lambda: self._resolve(url, priority),
+        )
+
+    @tracer.start_as_current_span("lookup_many")
+    async def lookup_many(
+        self,
+        urls: Sequence[str],
+        *,
+        key: Callable[[str], str] = str.strip,
+        max_concurrency: int,
+        timeout: float | None,
+        priority: Priority = Priority.background,
+    ) -> list[SongData | UnresolvableReason | None]:
+        """
+        Resolves multiple URLs, requesting each distinct key only once.
+
+        The results are in the order of the given URLs. The result is None for
+        URLs that could not be looked up or were not looked up before the
+        timeout.
+        """
+        span = trace.get_current_span()
+        url_by_key: dict[str, str] = {}
+        for url in urls:
+            url_by_key.setdefault(key(url), url)
+
+        span.set_attribute("songlinker.url_count", len(urls))
+        span.set_attribute("songlinker.lookup_count", len(url_by_key))
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _lookup(url: str, url_key: str) -> SongData | UnresolvableReason:
+            async with semaphore:
+                return await self.resolve(url, key=url_key, priority=priority)
+
+        task_by_key = {
+            url_key: asyncio.create_task(_lookup(url, url_key))
+            for url_key, url in url_by_key.items()
+        }
         try:
-            response = await self._client.get(
-                url=self.BASE_URL,
-                params={
-                    "url": url,
-                    "userCountry": "DE",
-                    "songIfSingle": "true",
-                    "key": self._api_key,
-                },
-            )
-        except httpx.RequestError as e:
-            raise IoException from e
+            if task_by_key:
+                _, pending = await asyncio.wait(task_by_key.values(), timeout=timeout)
+                if pending:
+                    _LOG.info("%d lookups timed out", len(pending))
+                    span.set_attribute("songlinker.timed_out_count", len(pending))
+        finally:
+            tasks = task_by_key.values()
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancellations to complete
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        result_by_key = {
+            url_key: self._lookup_result(task, url_by_key[url_key])
+            for url_key, task in task_by_key.items()
+        }
+        return [result_by_key[key(url)] for url in urls]
+
+    @staticmethod
+    def _lookup_result(
+        task: asyncio.Task[SongData | UnresolvableReason],
+        url: str,
+    ) -> SongData | UnresolvableReason | None:
+        if task.cancelled():
+            return None
+
+        try:
+            return task.result()
+        except UnavailableException:
+            _LOG.warning("Skipping lookup because song.link is unavailable")
+        except IoException as e:
+            _LOG.error("Could not look up data for URL %s", url, exc_info=e)
+        except (ValueError, KeyError, TypeError) as e:
+            # Includes validation errors of malformed responses
+            _LOG.error("Could not parse response for URL %s", url, exc_info=e)
+
+        return None
+
+    @tracer.start_as_current_span("lookup_links")
+    async def _resolve(
+        self,
+        url: str,
+        priority: Priority,
+    ) -> SongData | UnresolvableReason:
+        start = time.monotonic()
+        outcome = "error"
+        try:
+            result = await self._resolve_with_retries(url, priority)
+            if isinstance(result, UnresolvableReason):
+                outcome = "unresolvable"
+            else:
+                outcome = "success"
+            return result
+        except UnavailableException:
+            outcome = "unavailable"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            _lookup_duration.record(time.monotonic() - start, {"outcome": outcome})
+
+    async def _resolve_with_retries(
+        self,
+        url: str,
+        priority: Priority,
+    ) -> SongData | UnresolvableReason:
+        span = trace.get_current_span()
+        circuit_breaker = self._circuit_breaker
+        attempt = 0
+        while True:
+            span.set_attribute("songlinker.circuit_state", circuit_breaker.state.name)
+            try:
+                circuit_breaker.before_call()
+            except CircuitOpenException as e:
+                raise UnavailableException("song.link API is unavailable") from e
+
+            try:
+                result = await self._attempt(url, priority)
+            except TransientIoException:
+                circuit_breaker.on_failure()
+                attempt += 1
+                if attempt >= self._retry_policy.max_attempts:
+                    raise
+
+                span.set_attribute("songlinker.attempts", attempt + 1)
+                await asyncio.sleep(self._retry_policy.delay(attempt - 1))
+                continue
+            except BaseException:
+                circuit_breaker.on_neutral()
+                raise
+
+            circuit_breaker.on_success()
+            return result
+
+    async def _attempt(
+        self,
+        url: str,
+        priority: Priority,
+    ) -> SongData | UnresolvableReason:
+        async with self._rate_limiter.acquire(priority) as permit:
+            try:
+                response = await self._client.get(
+                    url=self.BASE_URL,
+                    params={
+                        "url": url,
+                        "userCountry": "DE",
+                        "songIfSingle": "true",
+                        "key": self._api_key,
+                    },
+                )
+            except httpx.RequestError as e:
+                raise TransientIoException from e
+
+            status_code = response.status_code
+            _responses.add(1, {"status_code": status_code})
+            if status_code == httpx.codes.TOO_MANY_REQUESTS:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                permit.rate_limited(retry_after)
+                raise RateLimitedException(retry_after)
 
-        status_code = response.status_code
         if response.is_success:
-            return self._parse_response(response.content)
+            data = await self._parse_response_async(response.content)
+            if data is None:
+                return UnresolvableReason.single_platform
+
+            return data
         elif 400 <= status_code < 500:
             try:
                 error = ErrorResponse.model_validate_json(response.content)
-                if error.code == "could_not_resolve_entity":
-                    return None
+                if error.code == UnresolvableReason.unknown_entity.value:
+                    return UnresolvableReason.unknown_entity
                 else:
                     raise IoException(
                         f"Client error during request:"
@@ -275,6 +680,33 @@ class LinkApi:
             except ValueError:
                 raise IoException(f"Client error during request: {status_code}")
         elif 500 <= status_code < 600:
-            raise IoException(f"Received server error {status_code}")
+            raise TransientIoException(f"Received server error {status_code}")
         else:
             raise IoException(f"Unexpected response status: {status_code}")
+
+
+def observe_link_api(api: LinkApi) -> None:
+    """
+    Exports the state of the rate limiter and circuit breaker of the given API
+    client as metrics. Must only be called once per process.
+    """
+    meter.create_observable_gauge(
+        "songlinker.link_api.circuit_state",
+        callbacks=[api._observe_circuit_state],
+        description="0: closed, 1: open, 2: half-open",
+    )
+    meter.create_observable_gauge(
+        "songlinker.link_api.in_flight",
+        callbacks=[api._observe_in_flight],
+        description="song.link requests in flight",
+    )
+    meter.create_observable_gauge(
+        "songlinker.link_api.waiting",
+        callbacks=[api._observe_waiting],
+        description="song.link requests waiting for the rate limiter",
+    )
+    meter.create_observable_gauge(
+        "songlinker.link_api.concurrency_limit",
+        callbacks=[api._observe_concurrency_limit],
+        description="Current adaptive concurrency limit for song.link",
+    )
@@ -0,0 +1,121 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING
+
+from opentelemetry import context, metrics
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+meter = metrics.get_meter(__name__)
+
+_dropped = meter.create_counter(
+    "songlinker.logging.dropped",
+    description="Log records that were dropped because the log queue was full",
+)
+
+# Attribute that carries the OpenTelemetry context of the logging call
+_CONTEXT_ATTRIBUTE = "otel_context"
+
+
+def parse_log_levels(value: str | None) -> dict[str, int]:
+    """
+    Parses per-logger levels like "songlinker=DEBUG,httpx=WARNING". An empty
+    logger name refers to the root logger.
+    """
+    if not value:
+        return {}
+
+    level_by_name = logging.getLevelNamesMapping()
+    result = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+
+        name, separator, level_name = item.partition("=")
+        if not separator:
+            raise ValueError(f"Missing level for logger {name.strip()}")
+
+        level = level_by_name.get(level_name.strip().upper())
+        if level is None:
+            raise ValueError(f"Unknown log level {level_name.strip()}")
+
+        result[name.strip()] = level
+
+    return result
+
+
+def apply_log_levels(levels: Mapping[str, int]) -> None:
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Puts records into a bounded queue without ever blocking the caller. If the
+    queue is full, the record is dropped and counted.
+    """
+
+    def __init__(self, queue: queue.Queue[logging.LogRecord]):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread. Only the context is
+        # captured here, because it is gone once the record leaves the thread.
+        setattr(record, _CONTEXT_ATTRIBUTE, context.get_current())
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            _dropped.add(1, {"level": record.levelname})
+
+
+class _ContextQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full, but the sentinel must not be dropped
+        self.queue.put(self._sentinel)  # type: ignore[attr-defined]
+
+    def handle(self, record: logging.LogRecord) -> None:
+        ctx = getattr(record, _CONTEXT_ATTRIBUTE, None)
+        if ctx is None:
+            super().handle(record)
+            return
+
+        token = context.attach(ctx)
+        try:
+            super().handle(record)
+        finally:
+            context.detach(token)
+
+
+def enqueue_handlers(
+    logger: logging.Logger,
+    *,
+    max_size: int,
+) -> QueueListener:
+    """
+    Moves the handlers of the logger to a background thread, so that logging
+    calls only put the record into a bounded queue.
+
+    The listener is stopped at exit, which flushes the remaining records.
+    """
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    record_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=max_size)
+    logger.addHandler(DroppingQueueHandler(record_queue))
+    listener = _ContextQueueListener(
+        record_queue,
+        *handlers,
+        respect_handler_level=True,
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
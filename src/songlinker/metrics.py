@@ -0,0 +1,222 @@
+import logging
+import math
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+
+from opentelemetry.sdk.metrics.export import (
+    Gauge,
+    Histogram,
+    HistogramDataPoint,
+    MetricReader,
+    MetricsData,
+    Sum,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from opentelemetry.sdk.metrics.export import Metric
+
+_LOG = logging.getLogger(__name__)
+
+# Bucket boundaries in seconds for durations of network calls and handlers
+DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+_UNIT_SUFFIXES = {
+    "s": "seconds",
+    "ms": "milliseconds",
+    "By": "bytes",
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class PrometheusMetricReader(MetricReader):
+    """
+    Collects metrics when they are scraped and renders them in the Prometheus
+    text exposition format.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._metrics_data: MetricsData | None = None
+
+    def _receive_metrics(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs: Any,
+    ) -> None:
+        self._metrics_data = metrics_data
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs: Any) -> None:
+        pass
+
+    def render(self) -> str:
+        with self._lock:
+            self.collect()
+            metrics_data = self._metrics_data
+            self._metrics_data = None
+
+        if metrics_data is None:
+            return ""
+
+        return render_metrics(metrics_data)
+
+
+def _sanitize_name(name: str) -> str:
+    return _INVALID_NAME_CHARS.sub("_", name)
+
+
+def _metric_name(metric: Metric) -> str:
+    name = _sanitize_name(metric.name)
+    suffix = _UNIT_SUFFIXES.get(metric.unit or "")
+    if suffix and not name.endswith(f"_{suffix}"):
+        name = f"{name}_{suffix}"
+
+    return name
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+
+    if math.isnan(value):
+        return "NaN"
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(value)
+
+
+def _format_label_value(value: Any) -> str:
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _sample(name: str, labels: Mapping[str, Any], value: float) -> str:
+    if not labels:
+        return f"{name} {_format_value(value)}"
+
+    formatted_labels = ",".join(
+        f'{_sanitize_name(key)}="{_format_label_value(label_value)}"'
+        for key, label_value in labels.items()
+    )
+    return f"{name}{{{formatted_labels}}} {_format_value(value)}"
+
+
+def _render_metric(metric: Metric) -> Iterable[str]:
+    name = _metric_name(metric)
+    data = metric.data
+    match data:
+        case Sum(is_monotonic=True):
+            metric_type = "counter"
+            if not name.endswith("_total"):
+                name = f"{name}_total"
+        case Sum() | Gauge():
+            metric_type = "gauge"
+        case Histogram():
+            metric_type = "histogram"
+        case _:
+            _LOG.warning("Skipping metric %s of unsupported type", metric.name)
+            return
+
+    if description := metric.description:
+        help_text = description.replace("\\", r"\\").replace("\n", r"\n")
+        yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {metric_type}"
+
+    for point in data.data_points:
+        labels = dict(point.attributes or {})
+        if isinstance(point, HistogramDataPoint):
+            cumulative_count = 0
+            for bound, count in zip(point.explicit_bounds, point.bucket_counts):
+                cumulative_count += count
+                yield _sample(
+                    f"{name}_bucket",
+                    {**labels, "le": _format_value(float(bound))},
+                    cumulative_count,
+                )
+            yield _sample(f"{name}_bucket", {**labels, "le": "+Inf"}, point.count)
+            yield _sample(f"{name}_sum", labels, point.sum)
+            yield _sample(f"{name}_count", labels, point.count)
+        else:
+            yield _sample(name, labels, point.value)
+
+
+def render_metrics(metrics_data: MetricsData) -> str:
+    lines = [
+        line
+        for resource_metrics in metrics_data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+        for line in _render_metric(metric)
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, reader: PrometheusMetricReader):
+        super().__init__(("", port), _MetricsRequestHandler)
+        self.reader = reader
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    server: _MetricsServer
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.reader.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes are too frequent to log
+        pass
+
+
+def start_metrics_server(
+    reader: PrometheusMetricReader,
+    *,
+    port: int,
+) -> ThreadingHTTPServer:
+    """
+    Serves the metrics of the reader at /metrics from a background thread.
+    """
+    server = _MetricsServer(port, reader)
+    thread = threading.Thread(
+        target=server.serve_forever,
+        name="metrics-server",
+        daemon=True,
+    )
+    thread.start()
+    _LOG.info("Serving metrics on port %d", server.server_address[1])
+    return server
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import logging
+from typing import TYPE_CHECKING
+
+from songlinker.cache import CacheException
+from songlinker.serialization import pack_song_data, unpack_song_data
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+
+    from nats.aio.client import Client
+    from nats.js.kv import KeyValue
+
+    from songlinker.config import NatsCacheConfig
+    from songlinker.link_api import SongData
+
+_LOG = logging.getLogger(__name__)
+
+
+def _to_kv_key(key: str) -> str:
+    # KV keys are restricted to a few characters, which URLs don't adhere to
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class NatsKvCache:
+    """
+    A cache backend shared between replicas, storing song data in a NATS
+    JetStream key-value bucket.
+
+    Entries expire after the TTL of the bucket, which is created on open if it
+    doesn't exist yet.
+    """
+
+    def __init__(self, config: NatsCacheConfig):
+        self._config = config
+        self._client: Client | None = None
+        self._kv: KeyValue | None = None
+
+    def _require_kv(self) -> KeyValue:
+        kv = self._kv
+        if kv is None:
+            raise CacheException("Cache is not open")
+
+        return kv
+
+    async def open(self) -> None:
+        # Only imported when the shared cache is actually used
+        import nats
+        from nats.errors import Error as NatsError
+        from nats.js.api import KeyValueConfig
+
+        config = self._config
+        _LOG.info("Opening shared cache in bucket %s", config.bucket)
+        credentials_file = config.credentials_file
+        try:
+            client = await nats.connect(
+                config.url,
+                name="songlinker-cache",
+                user_credentials=None
+                if credentials_file is None
+                else str(credentials_file),
+            )
+            self._client = client
+            js = client.jetstream(timeout=config.timeout_seconds)
+            # Returns the existing bucket if it has the same configuration
+            self._kv = await js.create_key_value(
+                KeyValueConfig(
+                    bucket=config.bucket,
+                    history=1,
+                    ttl=config.ttl_seconds,
+                    replicas=config.replicas,
+                )
+            )
+        except NatsError as e:
+            raise CacheException("Could not open shared cache") from e
+
+    async def get(self, key: str) -> SongData | None:
+        from nats.errors import Error as NatsError
+        from nats.js.errors import KeyDeletedError, KeyNotFoundError
+
+        kv = self._require_kv()
+        try:
+            entry = await kv.get(_to_kv_key(key))
+        except KeyNotFoundError, KeyDeletedError:
+            return None
+        except NatsError as e:
+            raise CacheException("Could not read from shared cache") from e
+
+        value = entry.value
+        if not value:
+            return None
+
+        try:
+            return unpack_song_data(value)
+        except ValueError as e:
+            raise CacheException("Invalid entry in shared cache") from e
+
+    async def put(self, keys: Collection[str], data: SongData) -> None:
+        from nats.errors import Error as NatsError
+
+        kv = self._require_kv()
+        try:
+            payload = pack_song_data(data)
+        except ValueError as e:
+            raise CacheException("Could not serialize entry for shared cache") from e
+
+        try:
+            await asyncio.gather(*(kv.put(_to_kv_key(key), payload) for key in keys))
+        except NatsError as e:
+            raise CacheException("Could not write to shared cache") from e
+
+    def record_hit(self, key: str) -> None:
+        # Entries are not ranked by popularity
+        pass
+
+    async def close(self) -> None:
+        self._kv = None
+        client = self._client
+        if client is not None:
+            self._client = None
+            await client.close()
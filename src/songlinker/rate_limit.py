@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+_LOG = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    # Lower values are served first
+    interactive = 0
+    background = 1
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses the value of a Retry-After header into a delay in seconds.
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except TypeError, ValueError:
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+class Permit:
+    def __init__(self) -> None:
+        self.retry_after: float | None = None
+        self.is_rate_limited = False
+
+    def rate_limited(self, retry_after: float | None) -> None:
+        self.is_rate_limited = True
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Limits requests with a token bucket and an adaptive concurrency limit.
+
+    The concurrency limit is adjusted with AIMD: it grows by one per window of
+    healthy responses and is halved on rate limit responses or latency spikes.
+    Waiting requests are served in order of their priority.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        latency_threshold: float,
+        min_concurrency: int = 1,
+        default_retry_after: float = 1.0,
+    ):
+        if burst < 1:
+            raise ValueError("burst must be positive")
+
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError("Invalid concurrency bounds")
+
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+
+        self._min_concurrency = min_concurrency
+        self._max_concurrency = max_concurrency
+        self._concurrency_limit = float(max_concurrency)
+        self._latency_threshold = latency_threshold
+        self._default_retry_after = default_retry_after
+        self._in_flight = 0
+
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._wake_handle: asyncio.TimerHandle | None = None
+
+    @classmethod
+    def unlimited(cls) -> RateLimiter:
+        return cls(
+            rate=math.inf,
+            burst=1,
+            max_concurrency=2**16,
+            latency_threshold=math.inf,
+        )
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._concurrency_limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if math.isinf(self._rate):
+            self._tokens = self._burst
+        else:
+            self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
+
+    def _delay_until_token(self, now: float) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        if self._tokens >= 1:
+            return 0.0
+
+        return (1 - self._tokens) / self._rate
+
+    def _wake(self) -> None:
+        if handle := self._wake_handle:
+            handle.cancel()
+            self._wake_handle = None
+
+        now = time.monotonic()
+        self._refill(now)
+
+        waiters = self._waiters
+        while waiters and self._in_flight < self.concurrency_limit:
+            if waiters[0][2].done():
+                # The waiter was cancelled
+                heapq.heappop(waiters)
+                continue
+
+            delay = self._delay_until_token(now)
+            if delay > 0:
+                self._schedule_wake(delay)
+                return
+
+            _, _, future = heapq.heappop(waiters)
+            self._tokens -= 1
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _schedule_wake(self, delay: float) -> None:
+        if self._wake_handle is not None:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._wake_handle = loop.call_later(delay, self._wake)
+
+    def _release(self, permit: Permit, latency: float) -> None:
+        self._in_flight -= 1
+
+        if permit.is_rate_limited:
+            retry_after = permit.retry_after or self._default_retry_after
+            _LOG.warning("Rate limited, pausing requests for %.1fs", retry_after)
+            self._paused_until = max(
+                self._paused_until,
+                time.monotonic() + retry_after,
+            )
+            self._decrease()
+        elif latency > self._latency_threshold:
+            _LOG.info("Slow response (%.1fs), reducing concurrency", latency)
+            self._decrease()
+        else:
+            self._concurrency_limit = min(
+                self._max_concurrency,
+                self._concurrency_limit + 1 / self._concurrency_limit,
+            )
+
+        self._wake()
+
+    def _decrease(self) -> None:
+        self._concurrency_limit = max(
+            self._min_concurrency,
+            self._concurrency_limit / 2,
+        )
+
+    @asynccontextmanager
+    async def acquire(self, priority: Priority) -> AsyncIterator[Permit]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._wake()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # We were granted a permit, but won't use it
+                self._in_flight -= 1
+                self._wake()
+            raise
+
+        permit = Permit()
+        start = time.monotonic()
+        try:
+            yield permit
+        finally:
+            self._release(permit, time.monotonic() - start)
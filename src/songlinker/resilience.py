@@ -0,0 +1,103 @@
+import logging
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class RetryPolicy:
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+
+    def delay(self, attempt: int) -> float:
+        """
+        Returns the delay before retrying after the given (zero-based) attempt,
+        using exponential backoff with full jitter.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitState(Enum):
+    closed = 0
+    open = 1
+    half_open = 2
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast after a number of consecutive failures.
+
+    Once the reset timeout has passed, a single probe call is let through. If it
+    succeeds, the circuit closes again, otherwise it stays open for another
+    reset timeout.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._is_probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        opened_at = self._opened_at
+        if opened_at is None:
+            return CircuitState.closed
+
+        if self._clock() - opened_at >= self._reset_timeout:
+            return CircuitState.half_open
+
+        return CircuitState.open
+
+    def before_call(self) -> None:
+        match self.state:
+            case CircuitState.closed:
+                return
+            case CircuitState.half_open if not self._is_probing:
+                _LOG.info("Circuit is half-open, probing")
+                self._is_probing = True
+                return
+            case _:
+                raise CircuitOpenException("Circuit is open")
+
+    def on_success(self) -> None:
+        if self._opened_at is not None:
+            _LOG.info("Closing circuit")
+
+        self._failures = 0
+        self._opened_at = None
+        self._is_probing = False
+
+    def on_failure(self) -> None:
+        self._failures += 1
+        if self._is_probing or self._failures >= self._failure_threshold:
+            if self._opened_at is None or self._is_probing:
+                _LOG.warning("Opening circuit after %d failures", self._failures)
+            self._opened_at = self._clock()
+            self._is_probing = False
+
+    def on_neutral(self) -> None:
+        """
+        Releases a probe call that neither succeeded nor failed.
+        """
+        self._is_probing = False
@@ -0,0 +1,136 @@
+import random
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF,
+    ALWAYS_ON,
+    ParentBased,
+    Sampler,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from opentelemetry.context import Context
+    from opentelemetry.sdk.trace import ReadableSpan, Span
+
+
+class TraceSampling(Enum):
+    # Export every trace
+    always = "always"
+    # Export a random share of traces
+    ratio = "ratio"
+    # Like ratio, but follow the decision of a remote parent
+    parent_ratio = "parent_ratio"
+    # Record every trace, but only export a random share of them, plus all
+    # traces with errors or slow root spans
+    tail = "tail"
+
+
+def create_sampler(
+    sampling: TraceSampling,
+    *,
+    ratio: float,
+    is_exporting: bool,
+) -> Sampler:
+    if not is_exporting:
+        # Nobody would see the spans, so don't even record them
+        return ALWAYS_OFF
+
+    match sampling:
+        case TraceSampling.always | TraceSampling.tail:
+            return ALWAYS_ON
+        case TraceSampling.ratio:
+            return TraceIdRatioBased(ratio)
+        case TraceSampling.parent_ratio:
+            return ParentBased(TraceIdRatioBased(ratio))
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    Buffers the spans of a trace until its local root span ends, and then
+    passes all or none of them on to the delegate.
+
+    Traces are kept if any of their spans failed, if the root span took longer
+    than the slow threshold, or by chance with the given ratio.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        *,
+        ratio: float,
+        slow_threshold: float,
+        max_traces: int = 4096,
+        random_func: Callable[[], float] = random.random,
+    ):
+        self._delegate = delegate
+        self._ratio = ratio
+        self._slow_threshold_nanos = int(slow_threshold * 1e9)
+        self._max_traces = max_traces
+        self._random = random_func
+        self._lock = threading.Lock()
+        self._spans_by_trace: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        # Decisions for spans that end after their root span
+        self._decisions: OrderedDict[int, bool] = OrderedDict()
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def _should_keep(self, root: ReadableSpan, spans: list[ReadableSpan]) -> bool:
+        if any(span.status.status_code == StatusCode.ERROR for span in spans):
+            return True
+
+        start_time = root.start_time
+        end_time = root.end_time
+        if start_time is not None and end_time is not None:
+            if end_time - start_time >= self._slow_threshold_nanos:
+                return True
+
+        return self._random() < self._ratio
+
+    def on_end(self, span: ReadableSpan) -> None:
+        context = span.context
+        if context is None:
+            return
+
+        trace_id = context.trace_id
+        parent = span.parent
+        is_local_root = parent is None or parent.is_remote
+
+        with self._lock:
+            decision = self._decisions.get(trace_id)
+            if decision is not None:
+                spans = [span] if decision else []
+            else:
+                spans = self._spans_by_trace.setdefault(trace_id, [])
+                spans.append(span)
+                if not is_local_root:
+                    self._evict(self._spans_by_trace)
+                    return
+
+                del self._spans_by_trace[trace_id]
+                decision = self._should_keep(span, spans)
+                self._decisions[trace_id] = decision
+                self._evict(self._decisions)
+                if not decision:
+                    spans = []
+
+        for kept_span in spans:
+            self._delegate.on_end(kept_span)
+
+    def _evict[V](self, entries: OrderedDict[int, V]) -> None:
+        while len(entries) > self._max_traces:
+            entries.popitem(last=False)
+
+    def shutdown(self) -> None:
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
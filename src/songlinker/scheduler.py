@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from songlinker.metrics import DURATION_BUCKETS
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+_LOG = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+_wait_time = meter.create_histogram(
+    "songlinker.scheduler.wait_time",
+    unit="s",
+    description="Time jobs spent queued before they started",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+_shed = meter.create_counter(
+    "songlinker.scheduler.shed",
+    description="Jobs that were dropped instead of run",
+)
+
+
+class _Job(NamedTuple):
+    func: Callable[[], Awaitable[None]]
+    created_at: float
+    enqueued_at: float
+
+
+class FairScheduler[K]:
+    """
+    Runs jobs with a global concurrency limit.
+
+    Jobs are queued per key and the keys are served round-robin, so a single
+    busy key can't starve the others. Jobs that are older than the max age when
+    they are submitted or would be started are shed.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        max_queue_size: int,
+        max_age: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._max_concurrency = max_concurrency
+        self._max_queue_size = max_queue_size
+        self._max_age = max_age
+        self._clock = clock
+        self._queues: OrderedDict[K, deque[_Job]] = OrderedDict()
+        self._queued = 0
+        self._running: set[asyncio.Task[None]] = set()
+        self._is_closed = False
+
+    def _observe_queued(self, options: CallbackOptions) -> Iterable[Observation]:
+        yield Observation(self._queued)
+
+    def _observe_running(self, options: CallbackOptions) -> Iterable[Observation]:
+        yield Observation(len(self._running))
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def _is_stale(self, job_created_at: float, now: float) -> bool:
+        return now - job_created_at > self._max_age
+
+    def submit(
+        self,
+        key: K,
+        func: Callable[[], Awaitable[None]],
+        *,
+        created_at: float | None = None,
+    ) -> bool:
+        """
+        Queues a job for the given key. Returns False if the job was shed.
+
+        The creation time (by the scheduler clock) is used to determine the
+        age of the job and defaults to now.
+        """
+        if self._is_closed:
+            raise RuntimeError("Scheduler is closed")
+
+        now = self._clock()
+        if created_at is None:
+            created_at = now
+
+        if self._is_stale(created_at, now):
+            _LOG.info("Shedding job that is %.0fs old", now - created_at)
+            _shed.add(1, {"reason": "stale"})
+            return False
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = deque()
+            self._queues[key] = queue
+        elif len(queue) >= self._max_queue_size:
+            _LOG.warning("Shedding job because the queue of its key is full")
+            _shed.add(1, {"reason": "queue_full"})
+            return False
+
+        queue.append(_Job(func=func, created_at=created_at, enqueued_at=now))
+        self._queued += 1
+        self._dispatch()
+        return True
+
+    def _next_job(self) -> _Job | None:
+        while self._queues:
+            key, queue = self._queues.popitem(last=False)
+            job = queue.popleft()
+            if queue:
+                # Move the key to the end of the line
+                self._queues[key] = queue
+            self._queued -= 1
+
+            now = self._clock()
+            if self._is_stale(job.created_at, now):
+                _LOG.info("Shedding queued job that is %.0fs old", now - job.created_at)
+                _shed.add(1, {"reason": "stale"})
+                continue
+
+            _wait_time.record(now - job.enqueued_at)
+            return job
+
+        return None
+
+    def _dispatch(self) -> None:
+        while not self._is_closed and len(self._running) < self._max_concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._on_done)
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            await job.func()
+        except Exception as e:
+            _LOG.error("Scheduled job failed", exc_info=e)
+
+    def _on_done(self, task: asyncio.Task[None]) -> None:
+        self._running.discard(task)
+        self._dispatch()
+
+    async def close(self) -> None:
+        """
+        Drops all queued jobs and cancels the running ones.
+        """
+        self._is_closed = True
+        self._queues.clear()
+        self._queued = 0
+
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+def observe_scheduler(scheduler: FairScheduler[Any]) -> None:
+    """
+    Exports the number of queued and running jobs of the given scheduler as
+    metrics. Must only be called once per process.
+    """
+    meter.create_observable_gauge(
+        "songlinker.scheduler.queued",
+        callbacks=[scheduler._observe_queued],
+        description="Jobs waiting to be started",
+    )
+    meter.create_observable_gauge(
+        "songlinker.scheduler.running",
+        callbacks=[scheduler._observe_running],
+        description="Jobs currently running",
+    )
@@ -0,0 +1,215 @@
+import json
+import struct
+from typing import Any
+
+from songlinker.link_api import (
+    Platform,
+    SongData,
+    SongLinks,
+    SongMetadata,
+    ThumbnailMetadata,
+)
+
+
+def song_data_to_dict(data: SongData) -> dict[str, Any]:
+    metadata = data.metadata
+    thumbnail = metadata.thumbnail
+    return {
+        "page": data.links.page,
+        "links": {platform.name: link for platform, link in data.links.items()},
+        "type": metadata.type,
+        "title": metadata.title,
+        "artist_name": metadata.artist_name,
+        "thumbnail": None
+        if thumbnail is None
+        else {
+            "url": thumbnail.url,
+            "width": thumbnail.width,
+            "height": thumbnail.height,
+        },
+    }
+
+
+def song_data_from_dict(raw: dict[str, Any]) -> SongData:
+    thumbnail = raw["thumbnail"]
+    return SongData(
+        links=SongLinks(
+            page=raw["page"],
+            link_by_platform={
+                Platform[platform]: link for platform, link in raw["links"].items()
+            },
+        ),
+        metadata=SongMetadata(
+            type=raw["type"],
+            title=raw["title"],
+            artist_name=raw["artist_name"],
+            thumbnail=None
+            if thumbnail is None
+            else ThumbnailMetadata(
+                url=thumbnail["url"],
+                width=thumbnail["width"],
+                height=thumbnail["height"],
+            ),
+        ),
+    )
+
+
+def dump_song_data(data: SongData) -> bytes:
+    return json.dumps(
+        song_data_to_dict(data),
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def load_song_data(raw: bytes | str) -> SongData:
+    return song_data_from_dict(json.loads(raw))
+
+
+# Compact binary format, used where payloads travel over the network:
+#
+#   version: u8, flags: u8, page, type, title, [artist_name],
+#   [thumbnail url, [width: u32], [height: u32]], link count: u8,
+#   (platform name, link) for each link
+#
+# Strings are UTF-8 with a u32 length prefix (u16 in version 1, which is still
+# read). Bracketed fields are only present if the corresponding flag is set.
+_BINARY_VERSION = 2
+
+_HAS_ARTIST_NAME = 1
+_HAS_THUMBNAIL = 2
+_HAS_THUMBNAIL_WIDTH = 4
+_HAS_THUMBNAIL_HEIGHT = 8
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+def _pack_string(buffer: bytearray, value: str) -> None:
+    encoded = value.encode("utf-8")
+    buffer += _U32.pack(len(encoded))
+    buffer += encoded
+
+
+class _Reader:
+    def __init__(self, raw: bytes):
+        self._raw = raw
+        self._offset = 0
+        self._string_length = _U32
+
+    def use_short_strings(self) -> None:
+        self._string_length = _U16
+
+    def _unpack(self, format: struct.Struct) -> int:
+        (value,) = format.unpack_from(self._raw, self._offset)
+        self._offset += format.size
+        return value
+
+    def u8(self) -> int:
+        return self._unpack(_U8)
+
+    def u32(self) -> int:
+        return self._unpack(_U32)
+
+    def string(self) -> str:
+        length = self._unpack(self._string_length)
+        end = self._offset + length
+        if end > len(self._raw):
+            raise ValueError("Truncated string")
+
+        value = self._raw[self._offset : end].decode("utf-8")
+        self._offset = end
+        return value
+
+    def finish(self) -> None:
+        if self._offset != len(self._raw):
+            raise ValueError("Unexpected trailing bytes")
+
+
+def pack_song_data(data: SongData) -> bytes:
+    metadata = data.metadata
+    thumbnail = metadata.thumbnail
+    links = list(data.links.items())
+
+    flags = 0
+    if metadata.artist_name is not None:
+        flags |= _HAS_ARTIST_NAME
+    if thumbnail is not None:
+        flags |= _HAS_THUMBNAIL
+        if thumbnail.width is not None:
+            flags |= _HAS_THUMBNAIL_WIDTH
+        if thumbnail.height is not None:
+            flags |= _HAS_THUMBNAIL_HEIGHT
+
+    buffer = bytearray(_U8.pack(_BINARY_VERSION))
+    buffer += _U8.pack(flags)
+    try:
+        _pack_string(buffer, data.links.page)
+        _pack_string(buffer, metadata.type)
+        _pack_string(buffer, metadata.title)
+        if metadata.artist_name is not None:
+            _pack_string(buffer, metadata.artist_name)
+        if thumbnail is not None:
+            _pack_string(buffer, thumbnail.url)
+            if thumbnail.width is not None:
+                buffer += _U32.pack(thumbnail.width)
+            if thumbnail.height is not None:
+                buffer += _U32.pack(thumbnail.height)
+
+        buffer += _U8.pack(len(links))
+        for platform, link in links:
+            _pack_string(buffer, platform.name)
+            _pack_string(buffer, link)
+    except struct.error as e:
+        # E.g. negative thumbnail dimensions
+        raise ValueError("Song data can't be packed") from e
+
+    return bytes(buffer)
+
+
+def unpack_song_data(raw: bytes) -> SongData:
+    """
+    Reads song data written by pack_song_data.
+
+    Raises a ValueError if the data is malformed or of an unknown version.
+    """
+    reader = _Reader(raw)
+    try:
+        version = reader.u8()
+        if version == 1:
+            reader.use_short_strings()
+        elif version != _BINARY_VERSION:
+            raise ValueError(f"Unknown format version {version}")
+
+        flags = reader.u8()
+        page = reader.string()
+        type = reader.string()
+        title = reader.string()
+        artist_name = reader.string() if flags & _HAS_ARTIST_NAME else None
+        thumbnail = None
+        if flags & _HAS_THUMBNAIL:
+            thumbnail = ThumbnailMetadata(
+                url=reader.string(),
+                width=reader.u32() if flags & _HAS_THUMBNAIL_WIDTH else None,
+                height=reader.u32() if flags & _HAS_THUMBNAIL_HEIGHT else None,
+            )
+
+        link_by_platform = {}
+        for _ in range(reader.u8()):
+            platform = Platform[reader.string()]
+            link_by_platform[platform] = reader.string()
+
+        reader.finish()
+    except (struct.error, KeyError) as e:
+        raise ValueError("Malformed song data") from e
+
+    return SongData(
+        links=SongLinks(page=page, link_by_platform=link_by_platform),
+        metadata=SongMetadata(
+            type=type,
+            title=title,
+            artist_name=artist_name,
+            thumbnail=thumbnail,
+        ),
+    )
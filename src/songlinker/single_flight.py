@@ -0,0 +1,41 @@
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+
+class SingleFlight[K, V]:
+    """
+    Coalesces concurrent calls for the same key into a single execution.
+
+    All callers receive the result (or exception) of the shared call. Cancelling
+    a caller does not cancel the shared call for the other callers.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[K, asyncio.Task[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def _forget(self, key: K, task: asyncio.Task[V]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # Mark the exception as retrieved, in case all callers were cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def run(
+        self,
+        key: K,
+        func: Callable[[], Coroutine[Any, Any, V]],
+    ) -> V:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        return await asyncio.shield(task)
@@ -0,0 +1,123 @@
+import itertools
+import json
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from songlinker.cache import CacheException
+from songlinker.serialization import song_data_from_dict, song_data_to_dict
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+    from typing import TextIO
+
+    from songlinker.link_api import SongData
+
+# Snapshots are JSON lines: a header, followed by one line per entry
+_FORMAT = "songlinker-cache"
+_VERSION = 1
+
+
+class SnapshotException(CacheException):
+    pass
+
+
+@dataclass(frozen=True, kw_only=True)
+class SnapshotEntry:
+    keys: list[str]
+    data: SongData
+    hits: int
+    expires_at: float
+
+
+def write_snapshot(file: TextIO, entries: Iterable[SnapshotEntry]) -> int:
+    """
+    Writes the entries to the file one at a time and returns their number.
+    """
+    header = {"format": _FORMAT, "version": _VERSION, "created_at": time.time()}
+    file.write(json.dumps(header) + "\n")
+
+    count = 0
+    for entry in entries:
+        line = {
+            "keys": entry.keys,
+            "hits": entry.hits,
+            "expires_at": entry.expires_at,
+            "data": song_data_to_dict(entry.data),
+        }
+        file.write(json.dumps(line, separators=(",", ":"), ensure_ascii=False))
+        file.write("\n")
+        count += 1
+
+    return count
+
+
+def _parse_entry(raw: dict[str, Any]) -> SnapshotEntry:
+    keys = raw["keys"]
+    if not keys or not isinstance(keys, list):
+        raise ValueError("keys must be a non-empty list")
+    if not all(isinstance(key, str) for key in keys):
+        raise ValueError("keys must be strings")
+
+    hits = raw["hits"]
+    if isinstance(hits, bool) or not isinstance(hits, int) or hits < 0:
+        raise ValueError("hits must be a non-negative integer")
+
+    expires_at = raw["expires_at"]
+    if isinstance(expires_at, bool) or not isinstance(expires_at, int | float):
+        raise ValueError("expires_at must be a number")
+
+    return SnapshotEntry(
+        keys=keys,
+        data=song_data_from_dict(raw["data"]),
+        hits=hits,
+        expires_at=expires_at,
+    )
+
+
+def read_snapshot(file: TextIO) -> Iterator[SnapshotEntry]:
+    """
+    Lazily reads the entries of a snapshot, skipping expired ones.
+    """
+    try:
+        header = json.loads(file.readline())
+    except ValueError as e:
+        raise SnapshotException("Missing snapshot header") from e
+
+    if header.get("format") != _FORMAT or header.get("version") != _VERSION:
+        raise SnapshotException(f"Unsupported snapshot: {header}")
+
+    for line_number, line in enumerate(file, start=2):
+        try:
+            entry = _parse_entry(json.loads(line))
+        except (ValueError, KeyError, TypeError) as e:
+            raise SnapshotException(f"Invalid entry in line {line_number}") from e
+
+        if entry.expires_at > time.time():
+            yield entry
+
+
+def read_snapshot_head(
+    path: Path,
+    *,
+    max_entries: int,
+    max_keys: int,
+) -> list[SnapshotEntry]:
+    """
+    Reads the first entries of the snapshot at the given path, which are the
+    most frequently used ones for snapshots exported from the persistent cache.
+
+    Reading stops before the entries have more than max_keys keys in total.
+    """
+    result = []
+    key_count = 0
+    with path.open("r", encoding="utf-8") as file:
+        for entry in itertools.islice(read_snapshot(file), max_entries):
+            key_count += len(entry.keys)
+            if key_count > max_keys:
+                break
+
+            result.append(entry)
+
+    return result
@@ -0,0 +1,305 @@
+import asyncio
+import itertools
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from songlinker.cache import CacheException
+from songlinker.serialization import dump_song_data, load_song_data
+from songlinker.snapshot import SnapshotEntry, read_snapshot, write_snapshot
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Collection
+    from pathlib import Path
+
+    from songlinker.link_api import SongData
+
+_LOG = logging.getLogger(__name__)
+
+# Number of snapshot entries imported per transaction
+_IMPORT_BATCH_SIZE = 500
+
+
+def _spread(total: int, parts: int) -> list[int]:
+    share, remainder = divmod(total, parts)
+    return [share + 1 if index < remainder else share for index in range(parts)]
+
+
+def _load(payload: bytes) -> SongData:
+    try:
+        return load_song_data(payload)
+    except (ValueError, KeyError, TypeError) as e:
+        raise CacheException("Invalid entry in persistent cache") from e
+
+
+class SqliteCache:
+    """
+    A persistent cache backend storing serialized song data in a single SQLite
+    file.
+
+    All database access happens on a dedicated thread, so the event loop never
+    blocks on disk I/O.
+
+    Hits are counted per key, so snapshots can be ordered by how often entries
+    were used. The counts are buffered in memory and written periodically, so
+    reads stay reads.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        ttl: float,
+        compaction_interval: float,
+    ):
+        self._path = path
+        self._ttl = ttl
+        self._compaction_interval = compaction_interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="sqlite-cache",
+        )
+        self._connection: sqlite3.Connection | None = None
+        self._pending_hits: dict[str, int] = {}
+        self._compaction_task: asyncio.Task[None] | None = None
+
+    async def _run[T](self, func: Callable[..., T], *args: object) -> T:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        except sqlite3.Error as e:
+            raise CacheException from e
+
+    def _require_connection(self) -> sqlite3.Connection:
+        connection = self._connection
+        if connection is None:
+            raise CacheException("Cache is not open")
+
+        return connection
+
+    def _open(self) -> None:
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            raise CacheException(f"Could not create {self._path.parent}") from e
+
+        connection = sqlite3.connect(
+            self._path,
+            autocommit=True,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # Only takes effect for new databases, i.e. before the table is created
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS song_data (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """
+        )
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(song_data)")}
+        if "hits" not in columns:
+            # Created before hits were counted
+            connection.execute(
+                "ALTER TABLE song_data ADD COLUMN hits INTEGER NOT NULL DEFAULT 0"
+            )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS song_data_expires_at ON song_data (expires_at)"
+        )
+        self._connection = connection
+
+    async def open(self) -> None:
+        _LOG.info("Opening persistent cache at %s", self._path)
+        await self._run(self._open)
+        self._compaction_task = asyncio.create_task(self._compact_periodically())
+
+    def _get(self, key: str) -> SongData | None:
+        row = (
+            self._require_connection()
+            .execute(
+                "SELECT payload FROM song_data WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        return _load(row[0])
+
+    async def get(self, key: str) -> SongData | None:
+        return await self._run(self._get, key)
+
+    def _put(self, keys: Collection[str], payload: bytes) -> None:
+        connection = self._require_connection()
+        expires_at = time.time() + self._ttl
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO song_data (key, payload, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET"
+                " payload = excluded.payload, expires_at = excluded.expires_at",
+                ((key, payload, expires_at) for key in keys),
+            )
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    async def put(self, keys: Collection[str], data: SongData) -> None:
+        await self._run(self._put, keys, dump_song_data(data))
+
+    def record_hit(self, key: str) -> None:
+        self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+
+    def _add_hits(self, hits: dict[str, int]) -> None:
+        connection = self._require_connection()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "UPDATE song_data SET hits = hits + ? WHERE key = ?",
+                ((count, key) for key, count in hits.items()),
+            )
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    async def flush_hits(self) -> None:
+        """
+        Writes the hits that were recorded since the last flush.
+        """
+        hits = self._pending_hits
+        if not hits:
+            return
+
+        self._pending_hits = {}
+        await self._run(self._add_hits, hits)
+
+    def _export(self, path: Path) -> int:
+        # Keys that share the same song data become a single entry, most
+        # frequently used first
+        rows = self._require_connection().execute(
+            """
+            SELECT json_group_array(key), payload, sum(hits), max(expires_at)
+            FROM song_data
+            WHERE expires_at > ?
+            GROUP BY payload
+            ORDER BY sum(hits) DESC
+            """,
+            (time.time(),),
+        )
+        entries = (
+            SnapshotEntry(
+                keys=json.loads(keys),
+                data=_load(payload),
+                hits=hits,
+                expires_at=expires_at,
+            )
+            for keys, payload, hits, expires_at in rows
+        )
+        with path.open("w", encoding="utf-8") as file:
+            return write_snapshot(file, entries)
+
+    async def export_snapshot(self, path: Path) -> int:
+        """
+        Writes all live entries to a snapshot file and returns their number.
+        """
+        await self.flush_hits()
+        return await self._run(self._export, path)
+
+    def _import(self, path: Path) -> int:
+        connection = self._require_connection()
+        count = 0
+        with path.open("r", encoding="utf-8") as file:
+            entries = read_snapshot(file)
+            while batch := list(itertools.islice(entries, _IMPORT_BATCH_SIZE)):
+                connection.execute("BEGIN")
+                try:
+                    connection.executemany(
+                        "INSERT INTO song_data (key, payload, expires_at, hits)"
+                        " VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (key) DO UPDATE SET"
+                        # The entry that lives longer is assumed to be newer
+                        " payload = CASE WHEN excluded.expires_at > expires_at"
+                        " THEN excluded.payload ELSE payload END,"
+                        " expires_at = max(expires_at, excluded.expires_at),"
+                        " hits = max(hits, excluded.hits)",
+                        (
+                            (key, dump_song_data(entry.data), entry.expires_at, hits)
+                            for entry in batch
+                            # Spread the hits, so the sum per entry stays the same
+                            for key, hits in zip(
+                                entry.keys,
+                                _spread(entry.hits, len(entry.keys)),
+                            )
+                        ),
+                    )
+                except sqlite3.Error:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+                count += len(batch)
+
+        return count
+
+    async def import_snapshot(self, path: Path) -> int:
+        """
+        Adds the entries of a snapshot file, keeping their expiry time, and
+        returns their number. Expired entries are skipped.
+        """
+        return await self._run(self._import, path)
+
+    def _compact(self) -> int:
+        connection = self._require_connection()
+        deleted = connection.execute(
+            "DELETE FROM song_data WHERE expires_at <= ?",
+            (time.time(),),
+        ).rowcount
+        connection.execute("PRAGMA incremental_vacuum")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    async def compact(self) -> None:
+        deleted = await self._run(self._compact)
+        _LOG.debug("Removed %d expired entries from persistent cache", deleted)
+
+    async def _compact_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._compaction_interval)
+            try:
+                await self.flush_hits()
+            except CacheException as e:
+                _LOG.error("Could not write hits to persistent cache", exc_info=e)
+
+            try:
+                await self.compact()
+            except CacheException as e:
+                _LOG.error("Could not compact persistent cache", exc_info=e)
+
+    def _close(self) -> None:
+        connection = self._connection
+        if connection is not None:
+            self._connection = None
+            connection.close()
+
+    async def close(self) -> None:
+        if task := self._compaction_task:
+            task.cancel()
+            self._compaction_task = None
+
+        try:
+            await self.flush_hits()
+        except CacheException as e:
+            _LOG.error("Could not write hits to persistent cache", exc_info=e)
+
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
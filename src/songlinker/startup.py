@@ -0,0 +1,66 @@
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+# Duration in seconds of each startup step, in order of completion
+STARTUP_STEPS: dict[str, float] = {}
+
+# Loads the config like the entry point does, which imports some modules lazily
+LOAD_CONFIG = (
+    "from bs_config import Env; from songlinker.config import Config;"
+    " Config.from_env(Env.load(include_default_dotenv=True))"
+)
+
+
+@contextmanager
+def startup_step(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_STEPS[name] = time.perf_counter() - start
+
+
+def parse_import_times(output: str) -> dict[str, float]:
+    """
+    Sums up the self time in seconds per top-level package from the output of
+    `python -X importtime`.
+    """
+    result: dict[str, float] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        self_time, _, module = line.removeprefix("import time:").split("|")
+        if not self_time.strip().isdigit():
+            # The header line
+            continue
+
+        package = module.strip().split(".", 1)[0]
+        result[package] = result.get(package, 0) + int(self_time) / 1_000_000
+
+    return result
+
+
+def profile_imports(
+    modules: Iterable[str],
+    *,
+    statements: Iterable[str] = (),
+) -> dict[str, float]:
+    """
+    Imports the given modules in a fresh interpreter, followed by running the
+    given statements, and returns the import time per top-level package.
+    """
+    statement = "; ".join([*(f"import {module}" for module in modules), *statements])
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_import_times(process.stderr)
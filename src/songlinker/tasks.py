@@ -0,0 +1,32 @@
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Coroutine
+
+
+class LatestTaskPerKey[K]:
+    """
+    Runs coroutines as tasks, cancelling the previous task for the same key if it
+    is still running.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[K, asyncio.Task[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _forget(self, key: K, task: asyncio.Task[Any]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def start[T](self, key: K, coro: Coroutine[Any, Any, T]) -> asyncio.Task[T]:
+        previous = self._tasks.get(key)
+        if previous is not None:
+            previous.cancel()
+
+        task = asyncio.create_task(coro)
+        self._tasks[key] = task
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return task
@@ -1,56 +1,95 @@
 import logging
 from typing import TYPE_CHECKING
 
-from opentelemetry import trace
-from opentelemetry._logs import set_logger_provider
-from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.instrumentation.asyncio import AsyncioInstrumentor
-from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
-from opentelemetry.instrumentation.logging import LoggingInstrumentor
-from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
-from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+from opentelemetry import metrics, trace
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.trace.sampling import Decision, StaticSampler
-from telegram.request import HTTPXRequest
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
 
-if TYPE_CHECKING:
-    import httpx
+from songlinker.metrics import PrometheusMetricReader, start_metrics_server
+from songlinker.sampling import (
+    TailSamplingSpanProcessor,
+    TraceSampling,
+    create_sampler,
+)
 
+if TYPE_CHECKING:
     from songlinker.config import Config
 
 
+def _add_span_exporter(trace_provider: TracerProvider, config: Config) -> None:
+    # The exporters pull in gRPC, which is slow to import
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    processor: SpanProcessor = BatchSpanProcessor(OTLPSpanExporter())
+    if config.trace_sampling == TraceSampling.tail:
+        processor = TailSamplingSpanProcessor(
+            processor,
+            ratio=config.trace_sample_percent / 100,
+            slow_threshold=config.trace_slow_threshold_ms / 1000,
+        )
+    trace_provider.add_span_processor(processor)
+
+
+def _add_log_exporter(resource: Resource) -> None:
+    from opentelemetry._logs import set_logger_provider
+    from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
+    from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
+    from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+
+    logger_provider = LoggerProvider(resource=resource)
+    set_logger_provider(logger_provider)
+    log_exporter = OTLPLogExporter()
+    logger_provider.add_log_record_processor(BatchLogRecordProcessor(log_exporter))
+    handler = LoggingHandler(logger_provider=logger_provider)
+    logging.root.addHandler(handler)
+
+
+def _serve_metrics(resource: Resource, port: int) -> None:
+    from opentelemetry.sdk.metrics import MeterProvider
+
+    reader = PrometheusMetricReader()
+    metrics.set_meter_provider(
+        MeterProvider(resource=resource, metric_readers=[reader])
+    )
+    start_metrics_server(reader, port=port)
+
+
 def setup_telemetry(config: Config) -> None:
+    """
+    Sets up tracing, log export and metrics. Subsystems that are disabled by the
+    config aren't imported at all, to keep the startup fast.
+    """
     resource = Resource(attributes={SERVICE_NAME: "telegram-songlinker-bot"})
 
     trace_provider = TracerProvider(
         resource=resource,
-        sampler=StaticSampler(Decision.RECORD_AND_SAMPLE),
+        sampler=create_sampler(
+            config.trace_sampling,
+            ratio=config.trace_sample_percent / 100,
+            is_exporting=config.enable_telemetry,
+        ),
     )
 
     if config.enable_telemetry:
-        exporter = OTLPSpanExporter()
-        processor = BatchSpanProcessor(exporter)
-        trace_provider.add_span_processor(processor)
+        _add_span_exporter(trace_provider, config)
 
     trace.set_tracer_provider(trace_provider)
 
     if config.enable_telemetry:
-        logger_provider = LoggerProvider(resource=resource)
-        set_logger_provider(logger_provider)
-        log_exporter = OTLPLogExporter()
-        logger_provider.add_log_record_processor(BatchLogRecordProcessor(log_exporter))
-        handler = LoggingHandler(logger_provider=logger_provider)
-        logging.root.addHandler(handler)
-
-    AsyncioInstrumentor().instrument()
-    LoggingInstrumentor().instrument()
-
-
-class InstrumentedHttpxRequest(HTTPXRequest):
-    def _build_client(self) -> httpx.AsyncClient:
-        client = super()._build_client()
-        HTTPXClientInstrumentor().instrument_client(client)
-        return client
+        _add_log_exporter(resource)
+
+    if (metrics_port := config.metrics_port) is not None:
+        _serve_metrics(resource, metrics_port)
+
+    if config.enable_telemetry or metrics_port is not None:
+        # Only produces spans and metrics, which nobody would see otherwise
+        from opentelemetry.instrumentation.asyncio import AsyncioInstrumentor
+
+        AsyncioInstrumentor().instrument()
+
+    if config.enable_telemetry:
+        # Adds trace IDs to log records, which are all zero without tracing
+        from opentelemetry.instrumentation.logging import LoggingInstrumentor
+
+        LoggingInstrumentor().instrument()
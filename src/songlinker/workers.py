@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING
+
+from opentelemetry import metrics
+
+from songlinker.link_api import LinkApi
+from songlinker.metrics import DURATION_BUCKETS
+from songlinker.serialization import pack_song_data, unpack_song_data
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from songlinker.link_api import SongData
+
+_LOG = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+_restarts = meter.create_counter(
+    "songlinker.workers.restarts",
+    description="Restarts of the worker pool by reason",
+)
+_ipc_duration = meter.create_histogram(
+    "songlinker.workers.call.duration",
+    unit="s",
+    description="Duration of calls to the worker pool, including IPC",
+    explicit_bucket_boundaries_advisory=DURATION_BUCKETS,
+)
+
+
+def _init_worker() -> None:
+    # Shutdown is coordinated by the main process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _parse_response(content: bytes, strict: bool) -> bytes | None:
+    # Runs in a worker process. Results are packed instead of pickled, which is
+    # both smaller and faster.
+    try:
+        data = LinkApi.parse_response(content, strict=strict)
+    except ValueError as e:
+        # Validation errors can't reliably be pickled
+        raise ValueError(str(e)) from None
+
+    if data is None:
+        return None
+
+    return pack_song_data(data)
+
+
+class WorkerPool:
+    """
+    Runs CPU-bound work like response parsing in a pool of worker processes,
+    keeping it off the event loop.
+
+    Each call costs the calling process a fixed overhead for IPC, which is
+    more than parsing a typical song.link response takes. The pool only takes
+    load off the event loop for responses of several hundred kilobytes.
+
+    The pool is health-checked periodically. If a worker crashes or the pool
+    stops responding, the pool is replaced with a fresh one. Calls that fail
+    because of a broken pool are retried in the current process.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        health_check_interval: float = 10,
+        health_check_timeout: float = 5,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be positive")
+
+        self._workers = workers
+        self._health_check_interval = health_check_interval
+        self._health_check_timeout = health_check_timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._health_check_task: asyncio.Task[None] | None = None
+
+    def _require_executor(self) -> ProcessPoolExecutor:
+        executor = self._executor
+        if executor is None:
+            raise RuntimeError("Worker pool is not open")
+
+        return executor
+
+    async def _start(self) -> None:
+        executor = ProcessPoolExecutor(
+            max_workers=self._workers,
+            # Forking would copy the threads of this process in a random state
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+        )
+        self._executor = executor
+        # Spawn all workers now instead of on the first calls
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, _ping) for _ in range(self._workers))
+        )
+
+    async def open(self) -> None:
+        _LOG.info("Starting %d worker processes", self._workers)
+        await self._start()
+        self._health_check_task = asyncio.create_task(self._check_periodically())
+
+    async def _restart(self, executor: ProcessPoolExecutor, reason: str) -> None:
+        if self._executor is not executor:
+            # Someone else already replaced it
+            return
+
+        _LOG.warning("Restarting worker pool (%s)", reason)
+        _restarts.add(1, {"reason": reason})
+        self._executor = None
+        if reason == "unresponsive":
+            # A hung worker would never pick up the shutdown request
+            executor.kill_workers()
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+        await self._start()
+
+    async def check_health(self) -> None:
+        """
+        Restarts the pool if it is broken or doesn't respond in time.
+        """
+        executor = self._require_executor()
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(
+                loop.run_in_executor(executor, _ping),
+                timeout=self._health_check_timeout,
+            )
+        except BrokenProcessPool:
+            await self._restart(executor, "crashed")
+        except TimeoutError:
+            await self._restart(executor, "unresponsive")
+
+    async def _check_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._health_check_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                _LOG.error("Worker pool health check failed", exc_info=e)
+
+    async def _run[T](self, func: Callable[..., T], *args: object) -> T:
+        executor = self._require_executor()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            await self._restart(executor, "crashed")
+            _LOG.warning("Running call in current process after worker crash")
+            return func(*args)
+        finally:
+            _ipc_duration.record(loop.time() - start)
+
+    async def parse_response(self, content: bytes, *, strict: bool) -> SongData | None:
+        packed = await self._run(_parse_response, content, strict)
+        if packed is None:
+            return None
+
+        return unpack_song_data(packed)
+
+    async def close(self) -> None:
+        if task := self._health_check_task:
+            task.cancel()
+            self._health_check_task = None
+
+        executor = self._executor
+        if executor is not None:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,51 @@
+import pytest
+
+from songlinker.bot import SongResult
+from songlinker.link_api import (
+    Platform,
+    SongData,
+    SongLinks,
+    SongMetadata,
+    ThumbnailMetadata,
+)
+
+
+@pytest.fixture
+def song_data() -> SongData:
+    return SongData(
+        links=SongLinks(
+            page="https://song.link/s/0d28khcov6AiegSCpG5TuT",
+            link_by_platform={
+                Platform.spotify: "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+                Platform.deezer: "https://www.deezer.com/track/3129407",
+            },
+        ),
+        metadata=SongMetadata(
+            type="song",
+            title="Feel Good Inc.",
+            artist_name="Gorillaz",
+            thumbnail=ThumbnailMetadata(
+                url="https://i.scdn.co/image/ab67616d0000b27319d85a472f328a6ed9b704cf",
+                width=640,
+                height=640,
+            ),
+        ),
+    )
+
+
+def test_inline_result_id_is_stable(song_data):
+    first = SongResult(song_data, is_spoiler=False).to_inline_result()
+    second = SongResult(song_data, is_spoiler=True).to_inline_result()
+
+    assert first.id == second.id
+    assert len(first.id) <= 64
+
+
+def test_message_content(song_data):
+    content = SongResult(song_data, is_spoiler=True).to_message_content()
+
+    assert content == (
+        "<tg-spoiler>Gorillaz - Feel Good Inc.</tg-spoiler>\n"
+        '[<a href="https://www.deezer.com/track/3129407">Deezer</a>, '
+        '<a href="https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT">Spotify</a>]'
+    )
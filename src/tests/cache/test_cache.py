@@ -0,0 +1,193 @@
+import pytest
+
+from songlinker.cache import CacheException, LookupCache, LruCache
+from songlinker.canonical import cache_key
+from songlinker.link_api import (
+    Platform,
+    SongData,
+    SongLinks,
+    SongMetadata,
+    UnresolvableReason,
+)
+
+
+def test_get_missing():
+    cache = LruCache[str, int](max_size=2, ttl=10)
+    assert cache.get("a") is None
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 0
+
+
+def test_get_hit():
+    cache = LruCache[str, int](max_size=2, ttl=10)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats.hits == 1
+    assert cache.stats.hit_rate == 1.0
+
+
+def test_expiry(clock):
+    cache = LruCache[str, int](max_size=2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = LruCache[str, int](max_size=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_lookup_cache_remembers_unresolvable():
+    cache = LookupCache(
+        LruCache(max_size=2, ttl=10),
+        LruCache(max_size=2, ttl=10),
+    )
+    cache.put_unresolvable("a", UnresolvableReason.unknown_entity)
+
+    assert await cache.get("a") is None
+    assert cache.get_unresolvable("a") == UnresolvableReason.unknown_entity
+    assert cache.get_unresolvable("b") is None
+    assert cache.unresolvable_stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_lookup_cache_indexes_platform_links():
+    data = SongData(
+        links=SongLinks(
+            page="https://song.link/s/0d28khcov6AiegSCpG5TuT",
+            link_by_platform={
+                Platform.spotify: "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+                Platform.tidal: "https://listen.tidal.com/track/2404575",
+            },
+        ),
+        metadata=SongMetadata(
+            type="song",
+            title="Feel Good Inc.",
+            artist_name="Gorillaz",
+            thumbnail=None,
+        ),
+    )
+    cache = LookupCache(
+        LruCache(max_size=10, ttl=10),
+        LruCache(max_size=10, ttl=10),
+    )
+    await cache.put(
+        cache_key("https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT"), data
+    )
+
+    assert await cache.get(cache_key("https://tidal.com/browse/track/2404575")) is data
+
+
+class _CountingBackend:
+    def __init__(self, data: SongData):
+        self._data = data
+        self.gets = 0
+        self.hits: dict[str, int] = {}
+
+    async def open(self) -> None:
+        pass
+
+    async def get(self, key: str) -> SongData | None:
+        self.gets += 1
+        return self._data if key == "stored" else None
+
+    async def put(self, keys, data: SongData) -> None:
+        pass
+
+    def record_hit(self, key: str) -> None:
+        self.hits[key] = self.hits.get(key, 0) + 1
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_lookup_cache_records_hits_in_backend():
+    data = SongData(
+        links=SongLinks(page="https://song.link/s/1", link_by_platform={}),
+        metadata=SongMetadata(
+            type="song",
+            title="Feel Good Inc.",
+            artist_name=None,
+            thumbnail=None,
+        ),
+    )
+    backend = _CountingBackend(data)
+    cache = LookupCache(
+        LruCache(max_size=10, ttl=10),
+        LruCache(max_size=10, ttl=10),
+        backend,
+    )
+
+    assert await cache.get("stored") is data
+    assert await cache.get("stored") is data
+    assert await cache.get("missing") is None
+
+    # The second hit is served from memory, but still counted
+    assert backend.gets == 2
+    assert backend.hits == {"stored": 2}
+
+
+def test_put_with_shorter_ttl(clock):
+    cache = LruCache[str, int](max_size=10, ttl=10, clock=clock)
+    cache.put("short", 1, ttl=2)
+    cache.put("long", 2, ttl=100)
+
+    clock.now = 5
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+    clock.now = 11
+
+    # Capped at the TTL of the cache
+    assert cache.get("long") is None
+
+
+class _BrokenBackend(_CountingBackend):
+    closed = False
+
+    async def open(self) -> None:
+        raise CacheException("unavailable")
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_lookup_cache_continues_without_broken_backend():
+    data = SongData(
+        links=SongLinks(page="https://song.link/s/1", link_by_platform={}),
+        metadata=SongMetadata(
+            type="song",
+            title="Feel Good Inc.",
+            artist_name=None,
+            thumbnail=None,
+        ),
+    )
+    backend = _BrokenBackend(data)
+    cache = LookupCache(
+        LruCache(max_size=10, ttl=10),
+        LruCache(max_size=10, ttl=10),
+        backend,
+    )
+
+    await cache.open()
+    await cache.put("key", data)
+
+    assert backend.closed
+    assert await cache.get("key") is data
+    assert await cache.get("stored") is None
+    assert backend.gets == 0
+    assert backend.hits == {}
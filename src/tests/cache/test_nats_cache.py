@@ -0,0 +1,87 @@
+import os
+import uuid
+from typing import TYPE_CHECKING
+
+import nats
+import pytest
+import pytest_asyncio
+
+from songlinker.config import NatsCacheConfig
+from songlinker.link_api import Platform, SongData, SongLinks, SongMetadata
+from songlinker.nats_cache import NatsKvCache
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+@pytest.fixture
+def nats_url(require_integration) -> str:
+    result = os.getenv("NATS_URL")
+    if not result:
+        pytest.skip("NATS_URL not set")
+    return result
+
+
+@pytest.fixture
+def song_data() -> SongData:
+    return SongData(
+        links=SongLinks(
+            page="https://song.link/s/0d28khcov6AiegSCpG5TuT",
+            link_by_platform={
+                Platform.spotify: "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+            },
+        ),
+        metadata=SongMetadata(
+            type="song",
+            title="Feel Good Inc.",
+            artist_name="Gorillaz",
+            thumbnail=None,
+        ),
+    )
+
+
+@pytest.fixture
+def config(nats_url) -> NatsCacheConfig:
+    return NatsCacheConfig(
+        url=nats_url,
+        credentials_file=None,
+        bucket=f"songlinker-test-{uuid.uuid4().hex}",
+        replicas=1,
+        ttl_seconds=60,
+        timeout_seconds=5,
+    )
+
+
+@pytest_asyncio.fixture
+async def cache(config) -> AsyncIterator[NatsKvCache]:
+    cache = NatsKvCache(config)
+    await cache.open()
+    try:
+        yield cache
+    finally:
+        await cache.close()
+        client = await nats.connect(config.url)
+        try:
+            await client.jetstream().delete_key_value(config.bucket)
+        finally:
+            await client.close()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_missing(cache):
+    assert await cache.get("https://example.com") is None
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_shared_between_instances(cache, config, song_data):
+    await cache.put(["https://open.spotify.com/track/0d28k?si=1", "alias"], song_data)
+
+    other = NatsKvCache(config)
+    await other.open()
+    try:
+        assert await other.get("https://open.spotify.com/track/0d28k?si=1") == song_data
+        assert await other.get("alias") == song_data
+    finally:
+        await other.close()
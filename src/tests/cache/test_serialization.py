@@ -0,0 +1,116 @@
+import struct
+
+import pytest
+
+from songlinker.link_api import (
+    Platform,
+    SongData,
+    SongLinks,
+    SongMetadata,
+    ThumbnailMetadata,
+)
+from songlinker.serialization import (
+    dump_song_data,
+    pack_song_data,
+    unpack_song_data,
+)
+
+
+def _song_data(
+    *,
+    title: str = "Feel Good Inc. – Ümlaut",
+    artist_name: str | None = "Gorillaz",
+    thumbnail: ThumbnailMetadata | None = None,
+) -> SongData:
+    return SongData(
+        links=SongLinks(
+            page="https://song.link/s/0d28khcov6AiegSCpG5TuT",
+            link_by_platform={
+                Platform.spotify: "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+                Platform.deezer: "https://www.deezer.com/track/3129407",
+            },
+        ),
+        metadata=SongMetadata(
+            type="song",
+            title=title,
+            artist_name=artist_name,
+            thumbnail=thumbnail,
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    "song_data",
+    [
+        _song_data(),
+        _song_data(artist_name=None),
+        _song_data(title="x" * 70_000),
+        _song_data(
+            thumbnail=ThumbnailMetadata(
+                url="https://i.scdn.co/image/ab67616d0000b273",
+                width=640,
+                height=None,
+            ),
+        ),
+    ],
+)
+def test_round_trip(song_data):
+    result = unpack_song_data(pack_song_data(song_data))
+
+    assert result == song_data
+    assert result.metadata == song_data.metadata
+    assert result.links.page == song_data.links.page
+    assert list(result.links.items()) == list(song_data.links.items())
+
+
+def test_smaller_than_json():
+    song_data = _song_data()
+
+    assert len(pack_song_data(song_data)) < len(dump_song_data(song_data))
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        b"\x09\x00",
+        pack_song_data(_song_data())[:-3],
+        pack_song_data(_song_data()) + b"\x00",
+    ],
+)
+def test_malformed(raw):
+    with pytest.raises(ValueError):
+        unpack_song_data(raw)
+
+
+def test_unpack_version_1():
+    def string(value: str) -> bytes:
+        encoded = value.encode("utf-8")
+        return struct.pack("<H", len(encoded)) + encoded
+
+    raw = (
+        b"\x01\x00"
+        + string("https://song.link/s/abc")
+        + string("song")
+        + string("Feel Good Inc.")
+        + b"\x01"
+        + string("spotify")
+        + string("https://open.spotify.com/track/abc")
+    )
+
+    result = unpack_song_data(raw)
+
+    assert result.metadata.title == "Feel Good Inc."
+    assert result.metadata.artist_name is None
+    assert list(result.links.items()) == [
+        (Platform.spotify, "https://open.spotify.com/track/abc")
+    ]
+
+
+def test_pack_invalid_thumbnail():
+    song_data = _song_data(
+        thumbnail=ThumbnailMetadata(url="https://example.com", width=-1, height=None),
+    )
+
+    with pytest.raises(ValueError):
+        pack_song_data(song_data)
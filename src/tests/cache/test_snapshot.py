@@ -0,0 +1,117 @@
+import io
+import json
+import time
+
+import pytest
+
+from songlinker.link_api import Platform, SongData, SongLinks, SongMetadata
+from songlinker.snapshot import (
+    SnapshotEntry,
+    SnapshotException,
+    read_snapshot,
+    read_snapshot_head,
+    write_snapshot,
+)
+
+
+def _entry(title: str, *, hits: int = 0, ttl: float = 60) -> SnapshotEntry:
+    return SnapshotEntry(
+        keys=[f"https://open.spotify.com/track/{title}", f"alias-{title}"],
+        data=SongData(
+            links=SongLinks(
+                page=f"https://song.link/s/{title}",
+                link_by_platform={
+                    Platform.spotify: f"https://open.spotify.com/track/{title}",
+                },
+            ),
+            metadata=SongMetadata(
+                type="song",
+                title=title,
+                artist_name=None,
+                thumbnail=None,
+            ),
+        ),
+        hits=hits,
+        expires_at=time.time() + ttl,
+    )
+
+
+def test_round_trip():
+    entries = [_entry("a", hits=2), _entry("b")]
+    file = io.StringIO()
+
+    assert write_snapshot(file, entries) == 2
+    file.seek(0)
+    result = list(read_snapshot(file))
+
+    assert result == entries
+    assert [entry.data.metadata for entry in result] == [
+        entry.data.metadata for entry in entries
+    ]
+
+
+def test_skips_expired():
+    file = io.StringIO()
+    write_snapshot(file, [_entry("a", ttl=-1), _entry("b")])
+    file.seek(0)
+
+    assert [entry.keys for entry in read_snapshot(file)] == [_entry("b").keys]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        '{"format": "other", "version": 1}\n',
+        '{"format": "songlinker-cache", "version": 2}\n',
+        '{"format": "songlinker-cache", "version": 1}\n{"keys": []}\n',
+    ],
+)
+def test_invalid(content):
+    with pytest.raises(SnapshotException):
+        list(read_snapshot(io.StringIO(content)))
+
+
+@pytest.mark.parametrize(
+    ("field", "value"),
+    [
+        ("keys", []),
+        ("keys", "https://open.spotify.com/track/a"),
+        ("keys", [1]),
+        ("hits", -1),
+        ("hits", 1.5),
+        ("hits", None),
+        ("expires_at", "tomorrow"),
+    ],
+)
+def test_invalid_entry(field, value):
+    file = io.StringIO()
+    write_snapshot(file, [_entry("a")])
+    header, line = file.getvalue().splitlines()
+    raw = json.loads(line)
+    raw[field] = value
+    content = f"{header}\n{json.dumps(raw)}\n"
+
+    with pytest.raises(SnapshotException):
+        list(read_snapshot(io.StringIO(content)))
+
+
+def test_read_head(tmp_path):
+    path = tmp_path / "snapshot.jsonl"
+    with path.open("w", encoding="utf-8") as file:
+        write_snapshot(file, [_entry(str(index)) for index in range(10)])
+
+    result = read_snapshot_head(path, max_entries=3, max_keys=100)
+
+    assert [entry.data.metadata.title for entry in result] == ["0", "1", "2"]
+
+
+def test_read_head_limits_keys(tmp_path):
+    path = tmp_path / "snapshot.jsonl"
+    with path.open("w", encoding="utf-8") as file:
+        write_snapshot(file, [_entry(str(index)) for index in range(10)])
+
+    # Each entry has two keys
+    result = read_snapshot_head(path, max_entries=10, max_keys=5)
+
+    assert [entry.data.metadata.title for entry in result] == ["0", "1"]
@@ -0,0 +1,210 @@
+import sqlite3
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+
+from songlinker.cache import CacheException
+from songlinker.link_api import (
+    Platform,
+    SongData,
+    SongLinks,
+    SongMetadata,
+    ThumbnailMetadata,
+)
+from songlinker.sqlite_cache import SqliteCache
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+
+
+@pytest.fixture
+def song_data() -> SongData:
+    return SongData(
+        links=SongLinks(
+            page="https://song.link/s/0d28khcov6AiegSCpG5TuT",
+            link_by_platform={
+                Platform.spotify: "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+                Platform.deezer: "https://www.deezer.com/track/3129407",
+            },
+        ),
+        metadata=SongMetadata(
+            type="song",
+            title="Feel Good Inc.",
+            artist_name="Gorillaz",
+            thumbnail=ThumbnailMetadata(
+                url="https://i.scdn.co/image/ab67616d0000b27319d85a472f328a6ed9b704cf",
+                width=640,
+                height=640,
+            ),
+        ),
+    )
+
+
+@pytest_asyncio.fixture
+async def cache(tmp_path: Path) -> AsyncIterator[SqliteCache]:
+    cache = SqliteCache(tmp_path / "cache.db", ttl=60, compaction_interval=60)
+    await cache.open()
+    try:
+        yield cache
+    finally:
+        await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_missing(cache):
+    assert await cache.get("https://example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_round_trip(cache, song_data):
+    await cache.put(["key", "alias"], song_data)
+    assert await cache.get("alias") == song_data
+    result = await cache.get("key")
+
+    assert result == song_data
+    assert result.metadata == song_data.metadata
+    assert result.links.page == song_data.links.page
+    assert list(result.links.items()) == list(song_data.links.items())
+
+
+@pytest.mark.asyncio
+async def test_survives_reopen(tmp_path, song_data):
+    path = tmp_path / "cache.db"
+    cache = SqliteCache(path, ttl=60, compaction_interval=60)
+    await cache.open()
+    await cache.put(["key"], song_data)
+    await cache.close()
+
+    cache = SqliteCache(path, ttl=60, compaction_interval=60)
+    await cache.open()
+    try:
+        assert await cache.get("key") == song_data
+    finally:
+        await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_compact_removes_expired(tmp_path, song_data):
+    cache = SqliteCache(tmp_path / "cache.db", ttl=-1, compaction_interval=60)
+    await cache.open()
+    try:
+        await cache.put(["key"], song_data)
+        assert await cache.get("key") is None
+        await cache.compact()
+    finally:
+        await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trip(tmp_path, cache, song_data):
+    other_data = SongData(
+        links=SongLinks(
+            page="https://song.link/s/other",
+            link_by_platform={Platform.tidal: "https://tidal.com/track/1"},
+        ),
+        metadata=SongMetadata(
+            type="song",
+            title="Other",
+            artist_name=None,
+            thumbnail=None,
+        ),
+    )
+    await cache.put(["other"], other_data)
+    await cache.put(["key", "alias"], song_data)
+    cache.record_hit("key")
+    cache.record_hit("alias")
+    cache.record_hit("other")
+
+    path = tmp_path / "snapshot.jsonl"
+    assert await cache.export_snapshot(path) == 2
+
+    target = SqliteCache(tmp_path / "target.db", ttl=60, compaction_interval=60)
+    await target.open()
+    try:
+        assert await target.import_snapshot(path) == 2
+        assert await target.get("alias") == song_data
+        assert await target.get("other") == other_data
+
+        # Hits survive the round trip, so the order stays the same
+        await target.export_snapshot(path)
+        titles = [
+            line.split('"title":"')[1].split('"')[0]
+            for line in path.read_text("utf-8").splitlines()[1:]
+        ]
+    finally:
+        await target.close()
+
+    assert titles == ["Feel Good Inc.", "Other"]
+
+
+@pytest.mark.asyncio
+async def test_adds_hits_to_old_database(tmp_path, song_data):
+    path = tmp_path / "cache.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE song_data ("
+        " key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    connection.commit()
+    connection.close()
+
+    cache = SqliteCache(path, ttl=60, compaction_interval=60)
+    await cache.open()
+    try:
+        await cache.put(["key"], song_data)
+        assert await cache.get("key") == song_data
+    finally:
+        await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_hits_on_close(tmp_path, song_data):
+    path = tmp_path / "cache.db"
+    cache = SqliteCache(path, ttl=60, compaction_interval=60)
+    await cache.open()
+    await cache.put(["key", "alias"], song_data)
+    assert await cache.get("key") == song_data
+    cache.record_hit("key")
+    cache.record_hit("key")
+    cache.record_hit("alias")
+    cache.record_hit("missing")
+    await cache.close()
+
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute("SELECT key, hits FROM song_data").fetchall()
+    finally:
+        connection.close()
+
+    # Reads alone don't count
+    assert dict(rows) == {"key": 2, "alias": 1}
+
+
+@pytest.mark.asyncio
+async def test_invalid_entry(tmp_path, cache, song_data):
+    await cache.put(["key"], song_data)
+    connection = sqlite3.connect(tmp_path / "cache.db")
+    connection.execute("UPDATE song_data SET payload = '{\"page\": 1}'")
+    connection.commit()
+    connection.close()
+
+    with pytest.raises(CacheException):
+        await cache.get("key")
+
+    with pytest.raises(CacheException):
+        await cache.export_snapshot(tmp_path / "snapshot.jsonl")
+
+
+@pytest.mark.asyncio
+async def test_open_fails_for_unusable_directory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("not a directory")
+    cache = SqliteCache(blocker / "cache.db", ttl=60, compaction_interval=60)
+
+    with pytest.raises(CacheException):
+        await cache.open()
+
+    await cache.close()
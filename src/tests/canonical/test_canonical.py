@@ -0,0 +1,84 @@
+import pytest
+
+from songlinker.canonical import CanonicalKey, cache_key, canonicalize
+from songlinker.link_api import Platform
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        (
+            "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT?si=abc",
+            CanonicalKey(Platform.spotify, "track", "0d28khcov6AiegSCpG5TuT"),
+        ),
+        (
+            "https://open.spotify.com/intl-de/track/0d28khcov6AiegSCpG5TuT",
+            CanonicalKey(Platform.spotify, "track", "0d28khcov6AiegSCpG5TuT"),
+        ),
+        (
+            "spotify:album:4MCfx7j6yThYSLMqh1EzJu",
+            CanonicalKey(Platform.spotify, "album", "4MCfx7j6yThYSLMqh1EzJu"),
+        ),
+        (
+            "https://music.youtube.com/watch?v=dTAAsCNK7RA&feature=share",
+            CanonicalKey(Platform.youtube, "video", "dTAAsCNK7RA"),
+        ),
+        (
+            "open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+            CanonicalKey(Platform.spotify, "track", "0d28khcov6AiegSCpG5TuT"),
+        ),
+        (
+            "https://youtu.be/dTAAsCNK7RA?si=xyz",
+            CanonicalKey(Platform.youtube, "video", "dTAAsCNK7RA"),
+        ),
+        (
+            "https://www.youtube.com/watch?v=dTAAsCNK7RA",
+            CanonicalKey(Platform.youtube, "video", "dTAAsCNK7RA"),
+        ),
+        (
+            "https://music.apple.com/de/album/bum-bum-eis/1560859189?i=1560859192",
+            CanonicalKey(Platform.apple_music, "song", "1560859192"),
+        ),
+        (
+            "https://music.apple.com/us/album/bum-bum-eis/1560859189",
+            CanonicalKey(Platform.apple_music, "album", "1560859189"),
+        ),
+        (
+            "https://www.deezer.com/en/track/1463179302",
+            CanonicalKey(Platform.deezer, "track", "1463179302"),
+        ),
+        (
+            "https://tidal.com/browse/track/194058552?u",
+            CanonicalKey(Platform.tidal, "track", "194058552"),
+        ),
+        (
+            "https://soundcloud.com/Finch-Music/bum-bum-eis?utm_source=x",
+            CanonicalKey(Platform.soundcloud, "track", "finch-music/bum-bum-eis"),
+        ),
+        (
+            "https://music.amazon.de/albums/B09VK5ZJ3R?trackAsin=B09VK61VGP",
+            CanonicalKey(Platform.amazon_music, "track", "B09VK61VGP"),
+        ),
+    ],
+)
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://spotify.link/abcdef",
+        "https://github.com/preparingforexams",
+        "https://open.spotify.com/",
+        "not a url",
+        "https://[invalid",
+    ],
+)
+def test_canonicalize_unknown(url):
+    assert canonicalize(url) is None
+
+
+def test_cache_key():
+    assert cache_key("https://youtu.be/dTAAsCNK7RA") == "youtube:video:dTAAsCNK7RA"
+    assert cache_key(" https://google.com ") == "https://google.com"
@@ -2,6 +2,19 @@ import pytest
 import uvloop
 
 
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
 @pytest.fixture()
 def require_integration(request: pytest.FixtureRequest) -> None:
     marker = request.node.get_closest_marker("integration")
@@ -0,0 +1,87 @@
+from telegram import MessageEntity
+
+from songlinker.entities import EntityMatch, EntityPosition, extract_url_matches
+
+_SPOTIFY = "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT"
+_YOUTUBE = "https://youtu.be/dQw4w9WgXcQ"
+
+
+def _url(text: str, url: str) -> MessageEntity:
+    offset = len(text[: text.index(url)].encode("utf-16-le")) // 2
+    return MessageEntity(type="url", offset=offset, length=len(url))
+
+
+def test_url_after_astral_characters():
+    text = f"🎵🎶 {_SPOTIFY}"
+
+    matches = extract_url_matches(text, [_url(text, _SPOTIFY)])
+
+    assert matches == [EntityMatch(position=EntityPosition(5, 53), url=_SPOTIFY)]
+
+
+def test_text_link():
+    entity = MessageEntity(type="text_link", offset=0, length=4, url=_SPOTIFY)
+
+    matches = extract_url_matches("this", [entity])
+
+    assert [match.url for match in matches] == [_SPOTIFY]
+
+
+def test_matches_are_ordered():
+    text = f"{_YOUTUBE} {_SPOTIFY}"
+
+    matches = extract_url_matches(text, [_url(text, _SPOTIFY), _url(text, _YOUTUBE)])
+
+    assert [match.url for match in matches] == [_YOUTUBE, _SPOTIFY]
+
+
+def test_spoilers():
+    text = f"{_YOUTUBE} and {_SPOTIFY}"
+    entities = [
+        _url(text, _YOUTUBE),
+        _url(text, _SPOTIFY),
+        # Covers the second URL, but starts before the first one ends
+        MessageEntity(type="spoiler", offset=20, length=len(text) - 20),
+        # A short spoiler starting before the second URL mustn't hide the first
+        MessageEntity(type="spoiler", offset=0, length=5),
+    ]
+
+    matches = extract_url_matches(text, entities)
+
+    assert [match.is_spoiler for match in matches] == [False, True]
+
+
+def test_spoiler_at_same_position():
+    text = _SPOTIFY
+    entities = [
+        _url(text, _SPOTIFY),
+        MessageEntity(type="spoiler", offset=0, length=len(text)),
+    ]
+
+    matches = extract_url_matches(text, entities)
+
+    assert matches == [
+        EntityMatch(position=EntityPosition(0, 53), url=_SPOTIFY, is_spoiler=True)
+    ]
+
+
+def test_repeated_url_is_deduplicated():
+    text = f"{_SPOTIFY} {_SPOTIFY}"
+    second = MessageEntity(type="url", offset=54, length=53)
+    entities = [
+        _url(text, _SPOTIFY),
+        second,
+        MessageEntity(type="spoiler", offset=second.offset, length=second.length),
+    ]
+
+    matches = extract_url_matches(text, entities)
+
+    assert matches == [
+        EntityMatch(position=EntityPosition(0, 53), url=_SPOTIFY, is_spoiler=True)
+    ]
+
+
+def test_song_link_is_skipped():
+    text = "https://song.link/s/0d28khcov6AiegSCpG5TuT"
+
+    assert extract_url_matches(text, [_url(text, text)]) == []
@@ -0,0 +1,58 @@
+import pytest
+
+from songlinker.hosts import HostClassifier, HostMatcher, is_music_url
+
+
+def test_host_matcher_matches_subdomains():
+    matcher = HostMatcher(["example.com", "music.example.org"])
+
+    assert matcher.matches("example.com")
+    assert matcher.matches("www.example.com")
+    assert matcher.matches("music.example.org")
+    assert not matcher.matches("example.org")
+    assert not matcher.matches("notexample.com")
+    assert not matcher.matches("com")
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+        "https://spotify.link/abcdef",
+        "https://music.youtube.com/watch?v=dTAAsCNK7RA",
+        "https://www.youtube.com/watch?v=dTAAsCNK7RA",
+        "youtu.be/dTAAsCNK7RA",
+        "https://music.apple.com/de/album/x/1560859189",
+        "https://on.soundcloud.com/abc",
+        "https://music.amazon.de/albums/B09VK5ZJ3R",
+    ],
+)
+def test_is_music_url(url):
+    assert is_music_url(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://github.com/preparingforexams",
+        "https://www.amazon.de/dp/B09VK5ZJ3R",
+        "https://google.com",
+        "not a url",
+    ],
+)
+def test_is_not_music_url(url):
+    assert not is_music_url(url)
+
+
+def test_classifier_samples_unknown_hosts():
+    classifier = HostClassifier(
+        unknown_host_sample_rate=0.5,
+        random_func=lambda: 0.4,
+    )
+    assert classifier.should_look_up("https://github.com")
+
+    classifier = HostClassifier(
+        unknown_host_sample_rate=0.5,
+        random_func=lambda: 0.6,
+    )
+    assert not classifier.should_look_up("https://github.com")
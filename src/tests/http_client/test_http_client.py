@@ -0,0 +1,45 @@
+import httpx
+import pytest
+
+from songlinker.http_client import DEFAULT_HTTP_CONFIG, prewarm
+
+
+def test_timeouts_are_separate():
+    timeout = DEFAULT_HTTP_CONFIG.timeout()
+
+    assert timeout.connect == DEFAULT_HTTP_CONFIG.connect_timeout_seconds
+    assert timeout.read == DEFAULT_HTTP_CONFIG.read_timeout_seconds
+    assert timeout.write == DEFAULT_HTTP_CONFIG.write_timeout_seconds
+    assert timeout.pool == DEFAULT_HTTP_CONFIG.pool_timeout_seconds
+
+
+@pytest.mark.asyncio
+async def test_create_client_with_http2():
+    assert DEFAULT_HTTP_CONFIG.http2
+
+    async with DEFAULT_HTTP_CONFIG.create_client() as client:
+        assert isinstance(client, httpx.AsyncClient)
+
+
+@pytest.mark.asyncio
+async def test_prewarm_opens_connections():
+    requests: list[httpx.Request] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(404)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+        await prewarm(client, "https://example.com", connections=3)
+
+    assert len(requests) == 3
+    assert all(request.method == "HEAD" for request in requests)
+
+
+@pytest.mark.asyncio
+async def test_prewarm_ignores_errors():
+    def handle(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("unreachable", request=request)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+        await prewarm(client, "https://example.com", connections=2)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import TYPE_CHECKING
 
@@ -5,7 +6,16 @@ import httpx
 import pytest
 import pytest_asyncio
 
-from songlinker.link_api import IoException, LinkApi, Platform
+from songlinker.link_api import (
+    IoException,
+    LinkApi,
+    Platform,
+    RateLimitedException,
+    UnavailableException,
+    UnresolvableReason,
+)
+from songlinker.resilience import CircuitBreaker, RetryPolicy
+from tests.link_api.test_parse_response import RESPONSE
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator
@@ -29,7 +39,10 @@ async def link_api(api_token) -> AsyncIterator[LinkApi]:
 
 @pytest_asyncio.fixture
 async def invalid_api() -> AsyncIterator[LinkApi]:
-    api = LinkApi(api_key="invalid")
+    api = LinkApi(
+        api_key="invalid",
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0),
+    )
     try:
         yield api
     finally:
@@ -63,6 +76,134 @@ async def test_server_error(mocker, invalid_api):
         )
 
 
+@pytest.mark.asyncio
+async def test_server_error_retried(mocker, invalid_api):
+    _client = mocker.patch.object(invalid_api, "_client", autospec=True)
+    get_mock = mocker.AsyncMock(
+        side_effect=[
+            httpx.Response(503),
+            httpx.Response(400, json={"code": "could_not_resolve_entity"}),
+        ],
+    )
+    _client.get = get_mock
+
+    data = await invalid_api.lookup_links("https://google.com")
+
+    assert data is None
+    assert get_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens(mocker):
+    api = LinkApi(
+        api_key="invalid",
+        retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0),
+        circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60),
+    )
+    _client = mocker.patch.object(api, "_client", autospec=True)
+    get_mock = mocker.AsyncMock(return_value=httpx.Response(502))
+    _client.get = get_mock
+
+    try:
+        with pytest.raises(IoException):
+            await api.lookup_links("https://google.com")
+
+        with pytest.raises(UnavailableException):
+            await api.lookup_links("https://google.com")
+    finally:
+        await api.close()
+
+    assert get_mock.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limited(mocker, invalid_api):
+    _client = mocker.patch.object(invalid_api, "_client", autospec=True)
+    get_mock = mocker.AsyncMock(
+        return_value=httpx.Response(429, headers={"Retry-After": "3"}),
+    )
+    _client.get = get_mock
+    with pytest.raises(RateLimitedException) as e:
+        await invalid_api.lookup_links(
+            "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT"
+        )
+
+    assert e.value.retry_after == 3
+
+
+@pytest.mark.asyncio
+async def test_lookup_many_deduplicates_by_key(mocker, invalid_api):
+    _client = mocker.patch.object(invalid_api, "_client", autospec=True)
+    get_mock = mocker.AsyncMock(
+        return_value=httpx.Response(400, json={"code": "could_not_resolve_entity"}),
+    )
+    _client.get = get_mock
+
+    results = await invalid_api.lookup_many(
+        [
+            "https://example.com/a?si=1",
+            "https://example.com/b",
+            "https://example.com/a?si=2",
+        ],
+        key=lambda url: url.split("?")[0],
+        max_concurrency=2,
+        timeout=None,
+    )
+
+    assert results == [UnresolvableReason.unknown_entity] * 3
+    assert get_mock.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_lookup_many_returns_partial_results(mocker, invalid_api):
+    _client = mocker.patch.object(invalid_api, "_client", autospec=True)
+
+    async def get(url: str, params: dict[str, str]) -> httpx.Response:
+        match params["url"]:
+            case "https://example.com/slow":
+                await asyncio.sleep(10)
+            case "https://example.com/broken":
+                raise httpx.RequestError("Test")
+
+        return httpx.Response(400, json={"code": "could_not_resolve_entity"})
+
+    _client.get = mocker.AsyncMock(side_effect=get)
+
+    results = await invalid_api.lookup_many(
+        [
+            "https://example.com/slow",
+            "https://example.com/broken",
+            "https://example.com/fast",
+        ],
+        max_concurrency=3,
+        timeout=0.1,
+    )
+
+    assert results == [None, None, UnresolvableReason.unknown_entity]
+
+
+@pytest.mark.asyncio
+async def test_lookup_many_survives_malformed_response(mocker, invalid_api):
+    _client = mocker.patch.object(invalid_api, "_client", autospec=True)
+
+    async def get(url: str, params: dict[str, str]) -> httpx.Response:
+        if params["url"] == "https://example.com/malformed":
+            return httpx.Response(200, json={"pageUrl": 42})
+
+        return httpx.Response(200, content=RESPONSE)
+
+    _client.get = mocker.AsyncMock(side_effect=get)
+
+    malformed, valid = await invalid_api.lookup_many(
+        ["https://example.com/malformed", "https://example.com/valid"],
+        max_concurrency=2,
+        timeout=None,
+    )
+
+    assert malformed is None
+    assert valid.links.page == "https://song.link/s/0d28khcov6AiegSCpG5TuT"
+
+
 @pytest.mark.default_cassette("TestLinkApi.yaml")
 @pytest.mark.integration
 @pytest.mark.vcr
@@ -111,3 +252,13 @@ class TestLinkApi:
     async def test_lookup_non_song(self, link_api):
         data = await link_api.lookup_links("https://google.com")
         assert data is None
+
+    @pytest.mark.asyncio
+    async def test_resolve_youtube_only_reason(self, link_api):
+        result = await link_api.resolve("https://www.youtube.com/watch?v=0_S3ytsXlIA")
+        assert result == UnresolvableReason.single_platform
+
+    @pytest.mark.asyncio
+    async def test_resolve_non_song_reason(self, link_api):
+        result = await link_api.resolve("https://google.com")
+        assert result == UnresolvableReason.unknown_entity
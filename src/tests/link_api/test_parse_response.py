@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from songlinker.link_api import LinkApi
+
+
+def _link(entity_id: str, url: str) -> dict[str, str]:
+    return {"entityUniqueId": entity_id, "url": url}
+
+
+def _entity(provider: str, title: str) -> dict[str, object]:
+    return {
+        "id": "1",
+        "type": "song",
+        "title": title,
+        "artistName": "Gorillaz",
+        "thumbnailUrl": f"https://{provider}.example/thumb.jpg",
+        "thumbnailWidth": 640.0,
+        "thumbnailHeight": 640,
+        "apiProvider": provider,
+        "platforms": [provider],
+    }
+
+
+RESPONSE = json.dumps(
+    {
+        "entityUniqueId": "SPOTIFY_SONG::0d28khcov6AiegSCpG5TuT",
+        "pageUrl": "https://song.link/s/0d28khcov6AiegSCpG5TuT",
+        "entitiesByUniqueId": {
+            "DEEZER_SONG::3129407": _entity("deezer", "Deezer Title"),
+            "SPOTIFY_SONG::0d28khcov6AiegSCpG5TuT": _entity("spotify", "Feel Good"),
+            "NAPSTER_SONG::tra.1": _entity("napster", "Napster Title"),
+        },
+        "linksByPlatform": {
+            "deezer": _link(
+                "DEEZER_SONG::3129407",
+                "https://www.deezer.com/track/3129407",
+            ),
+            "spotify": _link(
+                "SPOTIFY_SONG::0d28khcov6AiegSCpG5TuT",
+                "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+            ),
+            "napster": _link(
+                "NAPSTER_SONG::tra.1",
+                "https://play.napster.com/track/tra.1",
+            ),
+        },
+    }
+).encode()
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_parse_response(strict):
+    api = LinkApi(api_key="invalid", strict_parsing=strict)
+    data = api._parse_response(RESPONSE)
+
+    assert data is not None
+    assert data.links.page == "https://song.link/s/0d28khcov6AiegSCpG5TuT"
+    assert [platform.name for platform, _ in data.links.items()] == [
+        "deezer",
+        "spotify",
+    ]
+    assert data.metadata.title == "Feel Good"
+    assert data.metadata.thumbnail is not None
+    assert data.metadata.thumbnail.width == 640
+
+
+def test_lean_matches_strict():
+    strict = LinkApi(api_key="invalid", strict_parsing=True)
+    lean = LinkApi(api_key="invalid")
+
+    strict_data = strict._parse_response(RESPONSE)
+    lean_data = lean._parse_response(RESPONSE)
+
+    assert strict_data == lean_data
+    assert strict_data is not None
+    assert lean_data is not None
+    assert strict_data.metadata == lean_data.metadata
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_parse_invalid_response(strict):
+    api = LinkApi(api_key="invalid", strict_parsing=strict)
+    with pytest.raises(ValueError):
+        api._parse_response(b'{"pageUrl": "https://song.link/s/x"}')
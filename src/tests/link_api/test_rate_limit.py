@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from songlinker.rate_limit import Priority, RateLimiter, parse_retry_after
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("", None),
+        ("120", 120.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("garbage", None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+@pytest.mark.asyncio
+async def test_serves_interactive_first():
+    limiter = RateLimiter(
+        rate=1000,
+        burst=10,
+        max_concurrency=1,
+        latency_threshold=10,
+    )
+    order = []
+    release = asyncio.Event()
+
+    async def request(priority: Priority) -> None:
+        async with limiter.acquire(priority):
+            order.append(priority)
+            await release.wait()
+
+    blocker = asyncio.create_task(request(Priority.background))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(request(Priority.background)),
+        asyncio.create_task(request(Priority.interactive)),
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocker, *tasks)
+
+    assert order == [
+        Priority.background,
+        Priority.interactive,
+        Priority.background,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_delays_requests():
+    limiter = RateLimiter(
+        rate=20,
+        burst=1,
+        max_concurrency=10,
+        latency_threshold=10,
+    )
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    for _ in range(3):
+        async with limiter.acquire(Priority.background):
+            pass
+
+    # The first request uses the burst token, the other two wait 50ms each
+    assert loop.time() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_halves_concurrency():
+    limiter = RateLimiter(
+        rate=1000,
+        burst=10,
+        max_concurrency=8,
+        latency_threshold=10,
+    )
+
+    async with limiter.acquire(Priority.background) as permit:
+        permit.rate_limited(0.01)
+
+    assert limiter.concurrency_limit == 4
+
+    async with limiter.acquire(Priority.background):
+        pass
+
+    assert limiter.concurrency_limit == 4
+    assert limiter.in_flight == 0
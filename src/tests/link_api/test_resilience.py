@@ -0,0 +1,60 @@
+import pytest
+
+from songlinker.resilience import (
+    CircuitBreaker,
+    CircuitOpenException,
+    CircuitState,
+    RetryPolicy,
+)
+
+
+@pytest.fixture
+def breaker(clock) -> CircuitBreaker:
+    return CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+
+def test_retry_delay_is_bounded():
+    policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=3)
+    for attempt in range(5):
+        assert 0 <= policy.delay(attempt) <= min(3, 2**attempt)
+
+
+def test_opens_after_threshold(breaker):
+    breaker.on_failure()
+    assert breaker.state == CircuitState.closed
+    breaker.on_failure()
+    assert breaker.state == CircuitState.open
+
+    with pytest.raises(CircuitOpenException):
+        breaker.before_call()
+
+
+def test_success_resets_failures(breaker):
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+    assert breaker.state == CircuitState.closed
+
+
+def test_half_open_allows_single_probe(breaker, clock):
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.now = 10
+
+    assert breaker.state == CircuitState.half_open
+    breaker.before_call()
+    with pytest.raises(CircuitOpenException):
+        breaker.before_call()
+
+    breaker.on_success()
+    assert breaker.state == CircuitState.closed
+
+
+def test_failed_probe_reopens(breaker, clock):
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.now = 10
+
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == CircuitState.open
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from songlinker.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_coalesces_concurrent_calls():
+    single_flight = SingleFlight[str, int]()
+    calls = 0
+    release = asyncio.Event()
+
+    async def func() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 42
+
+    tasks = [asyncio.create_task(single_flight.run("key", func)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [42, 42, 42]
+    assert calls == 1
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_propagates_exception():
+    single_flight = SingleFlight[str, int]()
+    release = asyncio.Event()
+
+    async def func() -> int:
+        await release.wait()
+        raise ValueError("Test")
+
+    tasks = [asyncio.create_task(single_flight.run("key", func)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelling_caller_keeps_shared_call():
+    single_flight = SingleFlight[str, int]()
+    release = asyncio.Event()
+
+    async def func() -> int:
+        await release.wait()
+        return 42
+
+    cancelled = asyncio.create_task(single_flight.run("key", func))
+    waiting = asyncio.create_task(single_flight.run("key", func))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    release.set()
+
+    assert await waiting == 42
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
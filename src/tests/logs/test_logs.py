@@ -0,0 +1,76 @@
+import logging
+import queue
+import threading
+
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+
+from songlinker.logs import DroppingQueueHandler, enqueue_handlers, parse_log_levels
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+        self.threads: list[str] = []
+        self.trace_ids: list[int] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+        self.threads.append(threading.current_thread().name)
+        self.trace_ids.append(trace.get_current_span().get_span_context().trace_id)
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("songlinker.tests.logs")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    try:
+        yield logger
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+
+def test_parse_log_levels():
+    levels = parse_log_levels("songlinker=debug, httpx=WARNING,=ERROR,")
+
+    assert levels == {
+        "songlinker": logging.DEBUG,
+        "httpx": logging.WARNING,
+        "": logging.ERROR,
+    }
+
+
+@pytest.mark.parametrize("value", ["songlinker", "songlinker=LOUD"])
+def test_parse_log_levels_invalid(value):
+    with pytest.raises(ValueError):
+        parse_log_levels(value)
+
+
+def test_drops_when_full(logger):
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    logger.addHandler(handler)
+
+    for index in range(5):
+        logger.info("Message %d", index)
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_emits_on_listener_thread(logger):
+    recording = _RecordingHandler()
+    logger.addHandler(recording)
+    listener = enqueue_handlers(logger, max_size=16)
+    tracer = TracerProvider().get_tracer(__name__)
+
+    with tracer.start_as_current_span("handler") as span:
+        logger.info("Hello %s", "world")
+    listener.stop()
+
+    assert recording.messages == ["Hello world"]
+    assert recording.threads != [threading.current_thread().name]
+    assert recording.trace_ids == [span.get_span_context().trace_id]
@@ -0,0 +1,89 @@
+import urllib.error
+import urllib.request
+
+import pytest
+from opentelemetry.metrics import Observation
+from opentelemetry.sdk.metrics import MeterProvider
+
+from songlinker.metrics import PrometheusMetricReader, start_metrics_server
+
+
+@pytest.fixture
+def reader():
+    return PrometheusMetricReader()
+
+
+@pytest.fixture
+def meter(reader):
+    provider = MeterProvider(metric_readers=[reader])
+    try:
+        yield provider.get_meter("test")
+    finally:
+        provider.shutdown()
+
+
+def test_render_counter(reader, meter):
+    counter = meter.create_counter("songlinker.messages", description="Messages")
+    counter.add(2, {"outcome": "replied", "forwarded": False})
+
+    lines = reader.render().splitlines()
+
+    assert lines == [
+        "# HELP songlinker_messages_total Messages",
+        "# TYPE songlinker_messages_total counter",
+        'songlinker_messages_total{outcome="replied",forwarded="false"} 2',
+    ]
+
+
+def test_render_histogram(reader, meter):
+    histogram = meter.create_histogram(
+        "songlinker.lookup.duration",
+        unit="s",
+        explicit_bucket_boundaries_advisory=[0.1, 1.0],
+    )
+    histogram.record(0.05)
+    histogram.record(0.5)
+    histogram.record(5)
+
+    lines = reader.render().splitlines()
+
+    assert lines == [
+        "# TYPE songlinker_lookup_duration_seconds histogram",
+        'songlinker_lookup_duration_seconds_bucket{le="0.1"} 1',
+        'songlinker_lookup_duration_seconds_bucket{le="1.0"} 2',
+        'songlinker_lookup_duration_seconds_bucket{le="+Inf"} 3',
+        "songlinker_lookup_duration_seconds_sum 5.55",
+        "songlinker_lookup_duration_seconds_count 3",
+    ]
+
+
+def test_render_observable_gauge(reader, meter):
+    meter.create_observable_gauge(
+        "songlinker.cache.hit_rate",
+        callbacks=[lambda options: [Observation(0.5, {"cache": 'a"b'})]],
+    )
+
+    lines = reader.render().splitlines()
+
+    assert lines == [
+        "# TYPE songlinker_cache_hit_rate gauge",
+        'songlinker_cache_hit_rate{cache="a\\"b"} 0.5',
+    ]
+
+
+def test_server(reader, meter):
+    meter.create_counter("songlinker.messages").add(1)
+    server = start_metrics_server(reader, port=0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base_url}/metrics") as response:
+            body = response.read().decode("utf-8")
+
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{base_url}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "songlinker_messages_total 1" in body
+    assert e.value.code == 404
@@ -0,0 +1,77 @@
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON
+from opentelemetry.trace import Status, StatusCode
+
+from songlinker.sampling import (
+    TailSamplingSpanProcessor,
+    TraceSampling,
+    create_sampler,
+)
+
+_SECOND = 1_000_000_000
+
+
+@pytest.fixture
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture
+def tracer(exporter):
+    provider = TracerProvider(sampler=ALWAYS_ON)
+    provider.add_span_processor(
+        TailSamplingSpanProcessor(
+            SimpleSpanProcessor(exporter),
+            ratio=0,
+            slow_threshold=1,
+        )
+    )
+    return provider.get_tracer(__name__)
+
+
+def _exported_names(exporter: InMemorySpanExporter) -> list[str]:
+    return [span.name for span in exporter.get_finished_spans()]
+
+
+def test_fast_trace_is_dropped(tracer, exporter):
+    with tracer.start_as_current_span("root"):
+        with tracer.start_as_current_span("child"):
+            pass
+
+    assert _exported_names(exporter) == []
+
+
+def test_trace_with_error_is_kept(tracer, exporter):
+    with tracer.start_as_current_span("root"):
+        with tracer.start_as_current_span("child") as child:
+            child.set_status(Status(StatusCode.ERROR))
+
+    assert _exported_names(exporter) == ["child", "root"]
+
+
+def test_slow_trace_is_kept(tracer, exporter):
+    root = tracer.start_span("root", start_time=0)
+    root.end(end_time=2 * _SECOND)
+
+    assert _exported_names(exporter) == ["root"]
+
+
+def test_late_span_follows_decision(tracer, exporter):
+    root = tracer.start_span("root", start_time=0)
+    child = tracer.start_span("late", context=trace.set_span_in_context(root))
+    root.end(end_time=2 * _SECOND)
+    child.end()
+
+    assert _exported_names(exporter) == ["root", "late"]
+
+
+def test_sampler_without_exporter():
+    sampler = create_sampler(TraceSampling.always, ratio=1, is_exporting=False)
+
+    assert sampler is ALWAYS_OFF
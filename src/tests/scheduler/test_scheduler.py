@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from songlinker.scheduler import FairScheduler
+
+
+def _scheduler(**kwargs) -> FairScheduler[str]:
+    return FairScheduler(
+        **{
+            "max_concurrency": 1,
+            "max_queue_size": 10,
+            "max_age": 60,
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_keys_are_served_round_robin():
+    scheduler = _scheduler()
+    release = asyncio.Event()
+    order: list[str] = []
+
+    async def blocker() -> None:
+        await release.wait()
+
+    def job(name: str):
+        async def run() -> None:
+            order.append(name)
+
+        return run
+
+    scheduler.submit("busy", blocker)
+    for index in range(3):
+        scheduler.submit("busy", job(f"busy{index}"))
+    scheduler.submit("quiet", job("quiet"))
+
+    release.set()
+    while scheduler.running or scheduler.queued:
+        await asyncio.sleep(0)
+
+    assert order == ["busy0", "quiet", "busy1", "busy2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited():
+    scheduler = _scheduler(max_concurrency=2)
+    release = asyncio.Event()
+
+    async def blocker() -> None:
+        await release.wait()
+
+    for key in "abcd":
+        scheduler.submit(key, blocker)
+
+    assert scheduler.running == 2
+    assert scheduler.queued == 2
+
+    release.set()
+    while scheduler.running or scheduler.queued:
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds():
+    scheduler = _scheduler(max_queue_size=1)
+    release = asyncio.Event()
+
+    async def blocker() -> None:
+        await release.wait()
+
+    assert scheduler.submit("a", blocker)
+    assert scheduler.submit("a", blocker)
+    assert not scheduler.submit("a", blocker)
+    assert scheduler.submit("b", blocker)
+
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_jobs_are_shed(clock):
+    scheduler = _scheduler(clock=clock)
+    release = asyncio.Event()
+    ran: list[str] = []
+
+    async def blocker() -> None:
+        await release.wait()
+
+    async def job() -> None:
+        ran.append("job")
+
+    assert not scheduler.submit("a", job, created_at=clock.now - 61)
+
+    scheduler.submit("a", blocker)
+    assert scheduler.submit("b", job, created_at=clock.now - 30)
+    clock.now += 31
+    release.set()
+    while scheduler.running or scheduler.queued:
+        await asyncio.sleep(0)
+
+    assert ran == []
+
+
+@pytest.mark.asyncio
+async def test_failing_job_does_not_block():
+    scheduler = _scheduler()
+    ran: list[str] = []
+
+    async def fail() -> None:
+        raise ValueError("oops")
+
+    async def job() -> None:
+        ran.append("job")
+
+    scheduler.submit("a", fail)
+    scheduler.submit("a", job)
+    while scheduler.running or scheduler.queued:
+        await asyncio.sleep(0)
+
+    assert ran == ["job"]
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_running():
+    scheduler = _scheduler()
+    started = asyncio.Event()
+
+    async def forever() -> None:
+        started.set()
+        await asyncio.Event().wait()
+
+    scheduler.submit("a", forever)
+    scheduler.submit("a", forever)
+    await started.wait()
+
+    await scheduler.close()
+
+    assert scheduler.running == 0
+    assert scheduler.queued == 0
+    with pytest.raises(RuntimeError):
+        scheduler.submit("a", forever)
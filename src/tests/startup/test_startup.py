@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from songlinker.startup import LOAD_CONFIG, parse_import_times, profile_imports
+
+OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       1500 |     telegram._utils
+import time:      2500 |       4000 |   telegram
+import time:        30 |       4150 | songlinker.config
+Some unrelated warning
+"""
+
+
+def test_parse_import_times():
+    result = parse_import_times(OUTPUT)
+
+    assert result == {
+        "_io": pytest.approx(0.00012),
+        "telegram": pytest.approx(0.004),
+        "songlinker": pytest.approx(0.00003),
+    }
+
+
+def test_profile_imports():
+    result = profile_imports(["json"])
+
+    assert "json" in result
+
+
+def test_entry_point_defers_heavy_imports():
+    # Must run in a fresh interpreter, other tests import these anyway. Only
+    # the bot needs bs_nats_updater, whose own dependencies are out of reach.
+    script = f"""
+import sys
+import bs_nats_updater
+before = set(sys.modules)
+import songlinker.__main__
+{LOAD_CONFIG}
+print(*sorted((set(sys.modules) - before) & {{'telegram', 'pydantic', 'nats'}}))
+"""
+    process = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={
+            **os.environ,
+            "TELEGRAM_TOKEN": "1:token",
+            "SONGLINK_API_TOKEN": "token",
+        },
+    )
+
+    assert process.stdout.strip() == ""
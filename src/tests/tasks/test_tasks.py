@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from songlinker.tasks import LatestTaskPerKey
+
+
+@pytest.mark.asyncio
+async def test_newer_task_cancels_older():
+    tasks = LatestTaskPerKey[int]()
+    release = asyncio.Event()
+
+    async def work(value: int) -> int:
+        await release.wait()
+        return value
+
+    older = tasks.start(1, work(1))
+    other_key = tasks.start(2, work(2))
+    newer = tasks.start(1, work(3))
+    release.set()
+
+    assert await newer == 3
+    assert await other_key == 2
+    with pytest.raises(asyncio.CancelledError):
+        await older
+
+    assert len(tasks) == 0
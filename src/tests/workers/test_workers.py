@@ -0,0 +1,82 @@
+import json
+import os
+import signal
+from typing import TYPE_CHECKING
+
+import pytest
+import pytest_asyncio
+
+from songlinker.link_api import LinkApi
+from songlinker.workers import WorkerPool
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+def _entity(provider: str) -> dict[str, object]:
+    return {
+        "id": "1",
+        "type": "song",
+        "title": "Feel Good Inc.",
+        "artistName": "Gorillaz",
+        "apiProvider": provider,
+        "platforms": [provider],
+    }
+
+
+RESPONSE = json.dumps(
+    {
+        "pageUrl": "https://song.link/s/0d28khcov6AiegSCpG5TuT",
+        "entitiesByUniqueId": {
+            "DEEZER_SONG::3129407": _entity("deezer"),
+            "SPOTIFY_SONG::0d28khcov6AiegSCpG5TuT": _entity("spotify"),
+        },
+        "linksByPlatform": {
+            "deezer": {
+                "entityUniqueId": "DEEZER_SONG::3129407",
+                "url": "https://www.deezer.com/track/3129407",
+            },
+            "spotify": {
+                "entityUniqueId": "SPOTIFY_SONG::0d28khcov6AiegSCpG5TuT",
+                "url": "https://open.spotify.com/track/0d28khcov6AiegSCpG5TuT",
+            },
+        },
+    }
+).encode()
+
+
+@pytest_asyncio.fixture
+async def pool() -> AsyncIterator[WorkerPool]:
+    pool = WorkerPool(workers=1, health_check_timeout=10)
+    await pool.open()
+    try:
+        yield pool
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strict", [True, False])
+async def test_parse_response(pool, strict):
+    result = await pool.parse_response(RESPONSE, strict=strict)
+
+    expected = LinkApi.parse_response(RESPONSE, strict=strict)
+    assert result == expected
+    assert result.metadata == expected.metadata
+
+
+@pytest.mark.asyncio
+async def test_parse_response_invalid(pool):
+    with pytest.raises(ValueError):
+        await pool.parse_response(b'{"pageUrl": "https://song.link/s/x"}', strict=True)
+
+
+@pytest.mark.asyncio
+async def test_restarts_crashed_worker(pool):
+    pid = await pool._run(os.getpid)
+    os.kill(pid, signal.SIGKILL)
+
+    await pool.check_health()
+
+    assert await pool._run(os.getpid) != pid
+    assert await pool.parse_response(RESPONSE, strict=False) is not None